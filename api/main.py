@@ -1,12 +1,29 @@
-from fastapi import FastAPI, Query
+import asyncio
+import hmac
+import logging
+import time
+_t_import = time.perf_counter()
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 from typing import List, Optional
-from rag.pipeline import rag_chat, get_store
-from rag.models import ChatQuery, ChatResponse, Employee
-from rag.store import VectorStore
-from rag.config import META_PATH
+from rag.pipeline import (
+    rag_chat_async, rag_chat_batch_async, rag_chat_stream_async, store_lease,
+    reload_store, store_status, response_cache_stats,
+)
+from rag.models import ChatQuery, ChatResponse, BatchChatQuery, BatchChatResponse, Employee
+from rag.embedding import embedding_cache_stats
+from rag.metrics import render_metrics, request_seconds, span
+from rag.startup import startup
+from rag.config import PROFILE_HEADER, WARMUP, LOG_LEVEL, ADMIN_TOKEN
 import json
 
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("rag").setLevel(LOG_LEVEL)  # third-party loggers stay at WARNING
+# torch, faiss, scipy and the Gemini SDK are deferred (rag.lazy), so this is mostly FastAPI + pydantic
+_import_s = time.perf_counter() - _t_import
+
 app = FastAPI(title="HR Resource Query Chatbot (RAG)")
 
 app.add_middleware(
@@ -15,38 +32,130 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
-_store = None
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # label by route template, not raw path, so /metrics cardinality stays bounded
+        route = request.scope.get("route")
+        request_seconds.observe(time.perf_counter() - t0, getattr(route, "path", "unmatched"), str(status))
+
+def _json(model: BaseModel) -> Response:
+    # serialized here rather than by FastAPI so the "serialize" stage is measured
+    with span("serialize"):
+        body = model.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+def _profile_flag(header: Optional[str]) -> Optional[bool]:
+    # X-Profile: 0 exempts this request from PROFILE_RATE sampling; X-Profile: 1 forces profiling only
+    # with PROFILE_HEADER=1, since cProfile + tracemalloc and .prof dumps are costly; absent = sample
+    if header is None:
+        return None
+    if header.strip().lower() in ("1", "true", "yes", "on"):
+        return True if PROFILE_HEADER else None
+    return False
 
 @app.on_event("startup")
-def startup_event():
-    global _store
-    _store = get_store()
+async def startup_event():
+    startup.record("import_api", _import_s)
+    if WARMUP:
+        # in the background, so liveness answers while the model and index load
+        asyncio.get_running_loop().run_in_executor(None, startup.warm_up)
+    else:
+        startup.mark_ready()
 
 @app.get("/health")
-def health():
+@app.get("/health/live")
+async def health():
+    # liveness: the process is up and serving; says nothing about warm-up
     return {"status": "ok"}
 
+@app.get("/health/ready")
+async def ready(response: Response):
+    # readiness: 503 until warm-up has finished, so load balancers hold traffic back
+    state = startup.snapshot()
+    if not startup.ready:
+        response.status_code = 503
+    return state
+
+@app.get("/admin/index")
+async def admin_index():
+    return store_status()
+
+def _check_admin(token: Optional[str]):
+    # CORS allows any origin, so a shared secret header is what keeps browsers and strangers out
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = Query(default=False), x_admin_token: Optional[str] = Header(default=None)):
+    # load runs off the event loop; in-flight requests keep using the previous store until they finish.
+    # Without force, unchanged index files are not reloaded; a reload already running is not queued behind.
+    _check_admin(x_admin_token)
+    loop = asyncio.get_running_loop()
+    reloaded = await loop.run_in_executor(None, lambda: reload_store(force=force, blocking=False))
+    if reloaded is None:
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+    return {"reloaded": reloaded, **store_status()}
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"embedding": embedding_cache_stats(), "response": response_cache_stats()}
+
 @app.post("/chat", response_model=ChatResponse)
-def chat(q: ChatQuery):
-    return rag_chat(q.message, top_k=q.top_k)
+async def chat(q: ChatQuery, x_profile: Optional[str] = Header(default=None)):
+    try:
+        return _json(await rag_chat_async(q.message, top_k=q.top_k, hard_filters=q.hard_filters, timings=q.timings,
+                                          profile=_profile_flag(x_profile)))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="LLM generation timed out")
+
+@app.post("/chat/stream")
+async def chat_stream(q: ChatQuery):
+    async def events():
+        try:
+            async for event, data in rag_chat_stream_async(q.message, top_k=q.top_k, hard_filters=q.hard_filters,
+                                                           timings=q.timings):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except asyncio.TimeoutError:
+            yield f"event: error\ndata: {json.dumps({'detail': 'LLM generation timed out'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(q: BatchChatQuery, x_profile: Optional[str] = Header(default=None)):
+    try:
+        responses = await rag_chat_batch_async(q.messages, top_k=q.top_k, hard_filters=q.hard_filters,
+                                               timings=q.timings, profile=_profile_flag(x_profile))
+        return _json(BatchChatResponse(responses=responses))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="LLM generation timed out")
 
 @app.get("/employees/search", response_model=List[Employee])
 def employees_search(
+    response: Response,
     skill: Optional[str] = Query(default=None),
     min_years: Optional[int] = Query(default=None),
-    availability: Optional[str] = Query(default=None)
+    availability: Optional[str] = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
 ):
-    with open(META_PATH, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-    emps = [Employee(**e) for e in meta["employees"].values()]
-
-    def ok(e: Employee) -> bool:
-        if skill and not any(skill.lower() in s.lower() for s in e.skills):
-            return False
-        if min_years is not None and e.experience_years < min_years:
-            return False
-        if availability and e.availability.lower() != availability.lower():
-            return False
-        return True
-
-    return [e for e in emps if ok(e)]
+    with store_lease() as store:
+        rows = store.attrs.query(skill=skill, min_years=min_years, availability=availability)
+        response.headers["X-Total-Count"] = str(len(rows))
+        return [store.get_employee(int(r)) for r in rows[offset:offset + limit]]
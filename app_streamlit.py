@@ -2,7 +2,7 @@ import json
 import time
 import streamlit as st
 from typing import List, Dict, Any
-from rag.pipeline import rag_chat, get_store
+from rag.pipeline import rag_chat, rag_chat_stream, get_store
 from rag.config import GEMINI_API_KEY
 import warnings
 warnings.filterwarnings("ignore", message="Tried to instantiate class '__path__._path'")
@@ -66,6 +66,7 @@ with st.sidebar:
     st.markdown("### Controls")
     top_k = st.slider("Top-K candidates", min_value=3, max_value=10, value=5, help="How many candidates to consider after hybrid retrieval.")
     show_debug = st.checkbox("Show retrieval debug", value=False)
+    stream_mode = st.checkbox("Stream answer", value=True, help="Show candidates as soon as retrieval finishes, then stream the answer.")
 
     st.markdown("### Features")
     st.markdown(
@@ -113,6 +114,26 @@ with st.container():
 
 st.markdown("<hr class='soft'/>", unsafe_allow_html=True)
 
+# -------------- Candidate Cards --------------
+def render_candidates(results: List[Dict[str, Any]]):
+    if not results:
+        return
+    st.markdown("**Top Candidates**")
+    for item in results:
+        e = item["employee"]
+        score = item.get("score")
+        reasons = item.get("reasons", [])
+        cols = st.columns([2,1,2,2,1])
+        with cols[0]: st.markdown(f"**{e['name']}**")
+        with cols[1]: st.write(f"Exp: {e['experience_years']}y")
+        with cols[2]: st.write("Skills:", ", ".join(e['skills']))
+        with cols[3]: st.write("Projects:", ", ".join(e['projects']))
+        with cols[4]: st.write("Avail:", e['availability'])
+        if reasons:
+            st.markdown(" ".join([f"<span class='tag'>{r}</span>" for r in reasons]), unsafe_allow_html=True)
+        st.caption(f"Score: {score}")
+        st.markdown("<hr class='soft'/>", unsafe_allow_html=True)
+
 # -------------- Run Search --------------
 run_cols = st.columns([1,1,6])
 go = run_cols[0].button("🔎 Search", use_container_width=True)
@@ -131,17 +152,50 @@ if go and query.strip():
     if avail != "(any)":
         augmented += f" availability:{avail}"
 
-    with st.spinner("Thinking…"):
-        t0 = time.time()
-        resp = rag_chat(augmented, top_k=top_k)
-        latency = time.time() - t0
+    if stream_mode:
+        # candidates render first, the answer streams in underneath; the live view is
+        # cleared once the turn is saved so the timeline below does not show it twice
+        live = st.empty()
+        with live.container():
+            t0 = time.time()
+            events = rag_chat_stream(augmented, top_k=top_k, timings=show_debug)
+            _, first = next(events)
+            results, dbg = first["results"], first["debug"]
+            render_candidates(results)
+            done = {}
+
+            def tokens():
+                parts = []
+                try:
+                    for event, data in events:
+                        if event == "token":
+                            parts.append(data["text"])
+                            yield data["text"]
+                        elif event == "done":
+                            done.update(data)
+                except TimeoutError:
+                    # the LLM stream stalled past LLM_TIMEOUT / LLM_STREAM_TIMEOUT; keep what arrived
+                    note = "\n\n_(answer timed out)_"
+                    done["answer"] = "".join(parts).strip() + note
+                    yield note
+
+            st.write_stream(tokens())
+            latency = time.time() - t0
+        live.empty()
+        answer = done.get("answer", "")
+    else:
+        with st.spinner("Thinking…"):
+            t0 = time.time()
+            resp = rag_chat(augmented, top_k=top_k, timings=show_debug)
+            latency = time.time() - t0
+        answer, results, dbg = resp.answer, [r.model_dump() for r in resp.results], resp.debug
 
     # Save to history
     st.session_state.history.append(
         {"role": "user", "content": query.strip()}
     )
     st.session_state.history.append(
-        {"role": "assistant", "content": resp.answer, "results": [r.model_dump() for r in resp.results], "debug": resp.debug, "latency": round(latency, 3)}
+        {"role": "assistant", "content": answer, "results": results, "debug": dbg, "latency": round(latency, 3)}
     )
     # clear quick prompt once used
     st.session_state._quick_prompt = ""
@@ -158,22 +212,7 @@ for turn in st.session_state.history:
 
         # Candidate cards
         results = turn.get("results") or []
-        if results:
-            st.markdown("**Top Candidates**")
-            for item in results:
-                e = item["employee"]
-                score = item.get("score")
-                reasons = item.get("reasons", [])
-                cols = st.columns([2,1,2,2,1])
-                with cols[0]: st.markdown(f"**{e['name']}**")
-                with cols[1]: st.write(f"Exp: {e['experience_years']}y")
-                with cols[2]: st.write("Skills:", ", ".join(e['skills']))
-                with cols[3]: st.write("Projects:", ", ".join(e['projects']))
-                with cols[4]: st.write("Avail:", e['availability'])
-                if reasons:
-                    st.markdown(" ".join([f"<span class='tag'>{r}</span>" for r in reasons]), unsafe_allow_html=True)
-                st.caption(f"Score: {score}")
-                st.markdown("<hr class='soft'/>", unsafe_allow_html=True)
+        render_candidates(results)
 
         # Debug + export
         with st.expander("Debug & Export"):
@@ -0,0 +1,106 @@
+import numpy as np
+from typing import Optional
+from .cache import LRUCache
+from .columns import EmployeeColumns
+from .taxonomy import default_taxonomy
+
+# attribute values come from free text (queries, /employees/search), so cached masks are bounded
+BITMAP_CACHE_ENTRIES = 64
+
+class AttributeIndex:
+    """Structured-filter indexes over EmployeeColumns rows; every query returns sorted row ids."""
+
+    def __init__(self, columns: EmployeeColumns):
+        self.columns = columns
+        # skill -> posting list; experience sorted once so min_years is a binary search + tail slice.
+        # Both come precomputed from the column bundle when there is one.
+        self.skill_postings = columns.derived("skill_postings")
+        self.skill_posting_offsets = columns.derived("skill_posting_offsets")
+        self.years_order = columns.derived("years_order")
+        self.years_sorted = columns.derived("years_sorted")
+        self._bitmaps = LRUCache(max_entries=BITMAP_CACHE_ENTRIES)  # (attribute, value) -> bool row mask
+
+    def all_rows(self) -> np.ndarray:
+        return np.arange(len(self.columns), dtype=np.int64)
+
+    def skill_rows(self, term: str, canonical: bool = False) -> np.ndarray:
+        # default: substring of a skill, as /employees/search has always matched ("sql" finds PostgreSQL).
+        # canonical: entries naming the same canonical skill as term, as the retriever's skill boost does
+        if canonical:
+            matches = default_taxonomy().skill_matcher(term)
+        else:
+            key = term.lower()
+            matches = lambda v: key in v.lower()
+        lists = [
+            self.skill_postings[self.skill_posting_offsets[i]:self.skill_posting_offsets[i + 1]]
+            for i, v in enumerate(self.columns.skill_vocab) if matches(v)
+        ]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists))
+
+    def min_years_rows(self, min_years: int) -> np.ndarray:
+        start = np.searchsorted(self.years_sorted, min_years, side="left")
+        return np.sort(self.years_order[start:])
+
+    def _bitmap(self, key, build) -> np.ndarray:
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = build()
+            self._bitmaps.put(key, bitmap)
+        return bitmap
+
+    def _rows_bitmap(self, rows: np.ndarray) -> np.ndarray:
+        bitmap = np.zeros(len(self.columns), dtype=bool)
+        bitmap[rows] = True
+        return bitmap
+
+    def availability_bitmap(self, availability: str) -> np.ndarray:
+        key = availability.lower()
+        def build():
+            codes = [i for i, v in enumerate(self.columns.avail_vocab) if v.lower() == key]
+            return np.isin(self.columns.avail_codes, codes)
+        return self._bitmap(("availability", key), build)
+
+    def skill_bitmap(self, term: str) -> np.ndarray:
+        return self._bitmap(("skill", term.lower()), lambda: self._rows_bitmap(self.skill_rows(term, canonical=True)))
+
+    def min_years_bitmap(self, min_years: int) -> np.ndarray:
+        # one vectorized compare; not worth a cache slot per distinct value
+        return self.columns.years >= min_years
+
+    def project_bitmap(self, term: str) -> np.ndarray:
+        # rows with a project in the term's domain, through its synonyms as the retriever's domain boost does
+        key = term.lower()
+        bits = lambda: self.columns.project_term_bits((key,), default_taxonomy().project_matcher)[:, 0] != 0
+        return self._bitmap(("project", key), bits)
+
+    def constraint_bitmap(self, skills=(), min_years: Optional[int] = None, availability: Optional[str] = None,
+                          project_term: Optional[str] = None) -> Optional[np.ndarray]:
+        # rows meeting every constraint (any one of skills); None when nothing is constrained
+        masks = []
+        if skills:
+            masks.append(np.logical_or.reduce([self.skill_bitmap(s) for s in skills]))
+        if min_years is not None:
+            masks.append(self.min_years_bitmap(min_years))
+        if availability:
+            masks.append(self.availability_bitmap(availability))
+        if project_term:
+            masks.append(self.project_bitmap(project_term))
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+    def query(self, skill: Optional[str] = None, min_years: Optional[int] = None,
+              availability: Optional[str] = None) -> np.ndarray:
+        rows = None
+        if skill:
+            rows = self.skill_rows(skill)
+        if min_years is not None:
+            by_years = self.min_years_rows(min_years)
+            rows = by_years if rows is None else np.intersect1d(rows, by_years, assume_unique=True)
+        if rows is None:
+            rows = self.all_rows()
+        if availability:
+            rows = rows[self.availability_bitmap(availability)[rows]]
+        return rows
@@ -0,0 +1,420 @@
+import json
+import mmap
+import os
+import shutil
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from .models import Employee
+from .lexical import BM25_ARRAYS, build_bm25
+
+# 1: columns only; 2: adds per-row content hashes so incremental builds need no meta.json
+BUNDLE_FORMAT = 2
+READABLE_FORMATS = (1, 2)
+CURRENT_FILE = "CURRENT"
+
+def build_corpus_row(e: dict) -> str:
+    # the text each employee is embedded and BM25-indexed from
+    return f"{e['name']} | skills: {', '.join(e['skills'])} | exp: {e['experience_years']} years | projects: {', '.join(e['projects'])} | availability: {e['availability']}"
+
+def lexical_row(e: dict) -> str:
+    # the text BM25 indexes: the corpus row without its labels ("skills", "exp", "projects", ...),
+    # which every row shares, and without years and availability, which the boosts already cover
+    return " ".join([e["name"], *e["skills"], *e["projects"]])
+
+def _pack_csr(offsets: np.ndarray, ids: np.ndarray, width: int) -> np.ndarray:
+    # one packed bitset per row (np.packbits bit order), bit j set when id j is in the row
+    bits = np.zeros((len(offsets) - 1, max((width + 7) // 8, 1)), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    np.bitwise_or.at(bits, (rows, ids >> 3), (128 >> (ids & 7)).astype(np.uint8))
+    return bits
+
+def _intern(values: List[str], vocab: List[str], lookup: Dict[str, int]) -> List[int]:
+    ids = []
+    for v in values:
+        i = lookup.get(v)
+        if i is None:
+            i = len(vocab)
+            lookup[v] = i
+            vocab.append(v)
+        ids.append(i)
+    return ids
+
+def _csr(rows: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(r) for r in rows])
+    flat = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, flat
+
+class StringColumn:
+    """UTF-8 strings stored as one byte blob plus offsets, decoded on access."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, values: List[str]) -> "StringColumn":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+class _StringBuffer:
+    """Append-only UTF-8 bytes + offsets, so a build never holds every string as a Python object."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = [0]
+
+    def append(self, value: str):
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def build(self) -> StringColumn:
+        return StringColumn(np.frombuffer(bytes(self.data), dtype=np.uint8), np.asarray(self.offsets, dtype=np.int64))
+
+class CorpusTexts:
+    """Per-row texts rendered from the other columns: corpus rows for bundles that do not store
+    the texts blob, or the BM25 input."""
+
+    def __init__(self, columns: "EmployeeColumns", render=build_corpus_row):
+        self.columns = columns
+        self.render = render
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, row: int) -> str:
+        return self.render(self.columns.employee_dict(row))
+
+def _save_array(path: str, arr: np.ndarray):
+    # a whole memory-mapped file (a spilled or previous-bundle column) is copied file to file,
+    # so writing a large column never makes it resident in this process
+    if isinstance(arr, np.memmap) and isinstance(arr.base, mmap.mmap) and arr.flags.c_contiguous:
+        with open(path, "wb") as out, open(arr.filename, "rb") as src:
+            np.lib.format.write_array_header_1_0(out, np.lib.format.header_data_from_array_1_0(arr))
+            src.seek(arr.offset)
+            remaining = arr.nbytes
+            while remaining:
+                block = src.read(min(remaining, 1 << 24))
+                if not block:
+                    raise IOError(f"{arr.filename} is shorter than its {arr.shape} array")
+                out.write(block)
+                remaining -= len(block)
+        return
+    np.save(path, arr)
+
+def _skill_postings(c: "EmployeeColumns") -> np.ndarray:
+    # CSR skill table transposed: rows stay ascending within each skill
+    entry_rows = np.repeat(np.arange(len(c), dtype=np.int64), np.diff(c.skill_offsets))
+    return entry_rows[np.argsort(c.skill_ids, kind="stable")]
+
+def _skill_posting_offsets(c: "EmployeeColumns") -> np.ndarray:
+    counts = np.bincount(c.skill_ids, minlength=len(c.skill_vocab))
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+# arrays derived from the base columns; computed on first use, or read from the bundle
+DERIVED = {
+    "skill_bits": lambda c: _pack_csr(c.skill_offsets, c.skill_ids, len(c.skill_vocab)),
+    "skill_postings": _skill_postings,
+    "skill_posting_offsets": _skill_posting_offsets,
+    "years_order": lambda c: np.argsort(c.years, kind="stable"),
+    "years_sorted": lambda c: c.years[c.derived("years_order")],
+}
+
+def _bm25_part(name: str):
+    # the BM25 arrays are built together from the rows' fields; the first one requested fills in the rest
+    def compute(c: "EmployeeColumns") -> np.ndarray:
+        parts = build_bm25(CorpusTexts(c, lexical_row))
+        c._derived.update(parts)
+        return parts[name]
+    return compute
+
+DERIVED.update({name: _bm25_part(name) for name in BM25_ARRAYS})
+
+ARRAYS = ("vec_ids", "years", "avail_codes", "skill_offsets", "skill_ids", "project_offsets", "project_ids")
+STRINGS = ("emp_ids", "names", "texts")
+VOCABS = ("avail_vocab", "skill_vocab", "project_vocab")
+
+class EmployeeColumns:
+    """Employees laid out by vector row: a FAISS hit index is a plain array index."""
+
+    def __init__(self, vec_ids, emp_ids, names, texts, years, avail_codes, avail_vocab,
+                 skill_offsets, skill_ids, skill_vocab,
+                 project_offsets, project_ids, project_vocab, content_hashes=None, vectors=None, derived=None):
+        self.vec_ids = vec_ids
+        # full builds number vectors 0..n-1; incremental builds leave gaps after deletions
+        self._identity_ids = bool(len(vec_ids) == 0 or vec_ids[-1] == len(vec_ids) - 1)
+        self.emp_ids = emp_ids
+        self.names = names
+        # None: every row is build_corpus_row of its own columns, so the text is not stored twice
+        self.texts = CorpusTexts(self) if texts is None else texts
+        self.years = years
+        self.avail_codes = avail_codes
+        self.avail_vocab = avail_vocab
+        self.skill_offsets = skill_offsets
+        self.skill_ids = skill_ids
+        self.skill_vocab = skill_vocab
+        self.project_offsets = project_offsets
+        self.project_ids = project_ids
+        self.project_vocab = project_vocab
+        self.content_hashes = content_hashes  # (n, 20) sha1 digests of the corpus text, when known
+        self.vectors = vectors  # (n, d) float32 embeddings kept beside quantized indexes for exact rescoring
+        self._derived = dict(derived or {})
+        self._project_term_bits = {}
+        self._employees = {}
+
+    @classmethod
+    def from_meta(cls, meta: dict) -> "EmployeeColumns":
+        vec_to_emp = meta["vec_id_to_emp_id"]
+        vec_to_text = meta["vec_id_to_text"]
+        hashes = meta.get("content_hashes")
+        builder = ColumnsBuilder()
+        for v in sorted(int(k) for k in vec_to_emp):
+            e = meta["employees"][vec_to_emp[str(v)]]
+            builder.add(v, e, vec_to_text[str(v)], hashes.get(e["id"]) if hashes else None)
+        return builder.build()
+
+    def save(self, root: str, manifest: Optional[dict] = None, publish: bool = True) -> str:
+        # each build gets a fresh directory and CURRENT is switched by rename, so files
+        # that running workers have memory-mapped are never rewritten in place.
+        # publish=False leaves CURRENT alone; publish_bundle switches it once the index is written too
+        version = (manifest or {}).get("index_version") or str(os.getpid())
+        target = os.path.join(root, version)
+        tmp = target + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        for name in STRINGS:
+            col = getattr(self, name)
+            if isinstance(col, CorpusTexts):
+                continue
+            np.save(os.path.join(tmp, f"{name}.blob.npy"), col.blob)
+            np.save(os.path.join(tmp, f"{name}.offsets.npy"), col.offsets)
+        if self.content_hashes is not None:
+            np.save(os.path.join(tmp, "content_hashes.npy"), self.content_hashes)
+        if self.vectors is not None:
+            _save_array(os.path.join(tmp, "vectors.npy"), self.vectors)
+        for name in DERIVED:
+            np.save(os.path.join(tmp, f"{name}.npy"), self.derived(name))
+        header = dict(manifest or {}, format=BUNDLE_FORMAT, rows=len(self))
+        header.update({name: getattr(self, name) for name in VOCABS})
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        if publish:
+            publish_bundle(root, version)
+        return target
+
+    @classmethod
+    def open(cls, root: str, mmap: bool = True) -> Tuple["EmployeeColumns", dict]:
+        path = current_bundle(root)
+        mode = "r" if mmap else None
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") not in READABLE_FORMATS:
+            raise ValueError(f"Unsupported column bundle format {manifest.get('format')} in {path}")
+        kwargs = {name: load(name) for name in ARRAYS}
+        exists = lambda name: os.path.exists(os.path.join(path, f"{name}.npy"))
+        kwargs.update({name: StringColumn(load(f"{name}.blob"), load(f"{name}.offsets")) if exists(f"{name}.blob") else None
+                       for name in STRINGS})
+        kwargs.update({name: manifest[name] for name in VOCABS})
+        hashes = load("content_hashes") if exists("content_hashes") else None
+        vectors = load("vectors") if exists("vectors") else None
+        derived = {name: load(name) for name in DERIVED if exists(name)}
+        return cls(content_hashes=hashes, vectors=vectors, derived=derived, **kwargs), manifest
+
+    def __len__(self) -> int:
+        return len(self.vec_ids)
+
+    def derived(self, name: str) -> np.ndarray:
+        arr = self._derived.get(name)
+        if arr is None:
+            arr = DERIVED[name](self)
+            self._derived[name] = arr
+        return arr
+
+    @property
+    def skill_bits(self) -> np.ndarray:
+        return self.derived("skill_bits")
+
+    def rows_for(self, ids: np.ndarray) -> np.ndarray:
+        # FAISS vector ids -> row numbers, keeping -1 for empty result slots
+        if self._identity_ids:
+            return ids
+        rows = np.searchsorted(self.vec_ids, ids)
+        return np.where(ids == -1, -1, rows)
+
+    def skills(self, row: int) -> List[str]:
+        ids = self.skill_ids[self.skill_offsets[row]:self.skill_offsets[row + 1]]
+        return [self.skill_vocab[i] for i in ids]
+
+    def projects(self, row: int) -> List[str]:
+        ids = self.project_ids[self.project_offsets[row]:self.project_offsets[row + 1]]
+        return [self.project_vocab[i] for i in ids]
+
+    def skill_mask(self, pred) -> np.ndarray:
+        return np.packbits([bool(pred(v)) for v in self.skill_vocab] or [False])
+
+    def avail_mask(self, pred) -> np.ndarray:
+        return np.array([bool(pred(v)) for v in self.avail_vocab], dtype=bool)
+
+    def project_term_bits(self, terms: Tuple[str, ...], matcher) -> np.ndarray:
+        # bit j set when one of the row's project names satisfies matcher(terms[j]);
+        # cached by terms, so a given tuple is always asked for with the same matcher
+        bits = self._project_term_bits.get(terms)
+        if bits is None:
+            entry_rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.project_offsets))
+            rows, ids = [], []
+            for j, t in enumerate(terms):
+                match = matcher(t)
+                hit = np.array([bool(match(p)) for p in self.project_vocab] + [False], dtype=bool)
+                matched = np.unique(entry_rows[hit[self.project_ids]])
+                rows.append(matched)
+                ids.append(np.full(len(matched), j, dtype=np.int64))
+            bits = np.zeros((len(self), max((len(terms) + 7) // 8, 1)), dtype=np.uint8)
+            if rows:
+                rows, ids = np.concatenate(rows), np.concatenate(ids)
+                np.bitwise_or.at(bits, (rows, ids >> 3), (128 >> (ids & 7)).astype(np.uint8))
+            self._project_term_bits[terms] = bits
+        return bits
+
+    def employee_dict(self, row: int) -> dict:
+        return {
+            "id": self.emp_ids[row],
+            "name": self.names[row],
+            "skills": self.skills(row),
+            "experience_years": int(self.years[row]),
+            "projects": self.projects(row),
+            "availability": self.avail_vocab[self.avail_codes[row]],
+        }
+
+    def employee(self, row: int) -> Employee:
+        # validated once per row, then reused by every later hit
+        emp = self._employees.get(row)
+        if emp is None:
+            emp = Employee(**self.employee_dict(row))
+            self._employees[row] = emp
+        return emp
+
+    def text(self, row: int) -> str:
+        return self.texts[row]
+
+    def content_hash(self, row: int) -> Optional[str]:
+        return None if self.content_hashes is None else self.content_hashes[row].tobytes().hex()
+
+class ColumnsBuilder:
+    """Accumulates employees row by row (ascending vector id) into EmployeeColumns.
+
+    Vectors, when given, are appended to vectors_path rather than kept in memory; build() maps
+    the file and the caller removes it once the columns are saved.
+    """
+
+    def __init__(self, vectors_path: Optional[str] = None):
+        self.vec_ids, self.years, self.avail, self.hashes = [], [], [], bytearray()
+        self.emp_ids, self.names, self.texts = _StringBuffer(), _StringBuffer(), _StringBuffer()
+        self._hashed = True
+        self._corpus_texts = True  # every text so far equals build_corpus_row(e)
+        self.vectors, self.dim = bytearray(), 0
+        self.vectors_path, self._vectors_file, self._vector_rows = vectors_path, None, 0
+        self.skill_rows, self.project_rows = [], []
+        self.avail_vocab, self.skill_vocab, self.project_vocab = [], [], []
+        self._lookups = ({}, {}, {})
+
+    def __len__(self) -> int:
+        return len(self.vec_ids)
+
+    def add(self, vec_id: int, e: dict, text: str, content_hash: Optional[str] = None,
+            vector: Optional[np.ndarray] = None):
+        if self.vec_ids and vec_id <= self.vec_ids[-1]:
+            raise ValueError(f"vector ids must be added in ascending order ({vec_id} after {self.vec_ids[-1]})")
+        avail_lookup, skill_lookup, project_lookup = self._lookups
+        self.vec_ids.append(int(vec_id))
+        self.emp_ids.append(e["id"])
+        self.names.append(e["name"])
+        self.texts.append(text)
+        self._corpus_texts = self._corpus_texts and text == build_corpus_row(e)
+        self.years.append(int(e["experience_years"]))
+        self.avail.extend(_intern([e["availability"]], self.avail_vocab, avail_lookup))
+        self.skill_rows.append(_intern(e["skills"], self.skill_vocab, skill_lookup))
+        self.project_rows.append(_intern(e["projects"], self.project_vocab, project_lookup))
+        if content_hash is None:
+            self._hashed = False
+        elif self._hashed:
+            self.hashes += bytes.fromhex(content_hash)
+        if vector is not None:
+            self.dim = len(vector)
+            data = np.asarray(vector, dtype=np.float32).tobytes()
+            if self.vectors_path is None:
+                self.vectors += data
+            else:
+                if self._vectors_file is None:
+                    self._vectors_file = open(self.vectors_path, "wb")
+                self._vectors_file.write(data)
+            self._vector_rows += 1
+
+    def build(self) -> EmployeeColumns:
+        skill_offsets, skill_ids = _csr(self.skill_rows)
+        project_offsets, project_ids = _csr(self.project_rows)
+        hashes = None
+        if self.vec_ids and self._hashed:
+            hashes = np.frombuffer(bytes(self.hashes), dtype=np.uint8).reshape(-1, 20)
+        vectors = None
+        if self._vector_rows:
+            if self._vector_rows != len(self.vec_ids):
+                raise ValueError("vectors must be given for every row or none")
+            if self._vectors_file is not None:
+                self._vectors_file.close()
+                vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._vector_rows, self.dim))
+            else:
+                vectors = np.frombuffer(bytes(self.vectors), dtype=np.float32).reshape(-1, self.dim)
+        return EmployeeColumns(
+            vec_ids=np.asarray(self.vec_ids, dtype=np.int64),
+            emp_ids=self.emp_ids.build(),
+            names=self.names.build(),
+            texts=None if self._corpus_texts else self.texts.build(),
+            years=np.asarray(self.years, dtype=np.int32),
+            avail_codes=np.asarray(self.avail, dtype=np.int16),
+            avail_vocab=self.avail_vocab,
+            skill_offsets=skill_offsets,
+            skill_ids=skill_ids,
+            skill_vocab=self.skill_vocab,
+            project_offsets=project_offsets,
+            project_ids=project_ids,
+            project_vocab=self.project_vocab,
+            content_hashes=hashes,
+            vectors=vectors,
+        )
+
+def current_bundle(root: str) -> str:
+    with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+        return os.path.join(root, f.read().strip())
+
+def publish_bundle(root: str, version: str):
+    # switch CURRENT to a saved bundle
+    previous = os.path.basename(current_bundle(root)) if has_bundle(root) else version
+    pointer = os.path.join(root, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    # the previous bundle stays for workers that are still opening it
+    _prune_bundles(root, keep=(version, previous))
+
+def has_bundle(root: str) -> bool:
+    return os.path.exists(os.path.join(root, CURRENT_FILE))
+
+def _prune_bundles(root: str, keep: Tuple[str, ...]):
+    # unlinking is safe for workers that still map old files; the pages live until they unmap
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name not in keep and os.path.isdir(path) and not name.endswith(".tmp"):
+            shutil.rmtree(path, ignore_errors=True)
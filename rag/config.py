@@ -9,5 +9,62 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM
 DATA_PATH = os.getenv("DATA_PATH", "./data/employee_data.json")
 INDEX_PATH = os.getenv("INDEX_PATH", "./data/index.faiss")
 META_PATH  = os.getenv("META_PATH", "./data/meta.json")
+COLUMNS_DIR = os.getenv("COLUMNS_DIR", "./data/columns")  # memory-mapped metadata columns written by build_index.py
+MMAP_INDEX = os.getenv("MMAP_INDEX", "1") == "1"  # map the FAISS index read-only instead of copying it into RAM
+EMB_CACHE_PATH = os.getenv("EMB_CACHE_PATH", "./data/emb_cache")  # directory: content hash -> embedding, reused across builds
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))  # sentences per encoder forward pass
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))  # build-time encoder processes, 0 = encode in this process
+BUILD_CHUNK_SIZE = int(os.getenv("BUILD_CHUNK_SIZE", "4096"))  # rows embedded and added to the index per step
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")  # "torch" = SentenceTransformer, "onnx" = ONNX Runtime export
+ONNX_DIR = os.getenv("ONNX_DIR", "./data/onnx")  # written by scripts/export_onnx.py
+ONNX_INT8 = os.getenv("ONNX_INT8", "0") == "1"  # use the dynamically int8-quantized export
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # intra-op threads per encode call, 0 = ONNX Runtime default
 
 TOP_K = int(os.getenv("TOP_K", "5"))
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", "100"))  # largest top_k a /chat request may ask for
+TAXONOMY_PATH = os.getenv("TAXONOMY_PATH", "")  # skills / domains / synonyms JSON for parse_query; empty = rag/taxonomy.json
+HARD_FILTERS = os.getenv("HARD_FILTERS", "0") == "1"  # default for requests: parsed constraints restrict the vector search
+FUSION = os.getenv("FUSION", "none")  # "none" = dense + boosts, "rrf" = fuse dense and BM25 rankings (changes the score scale)
+RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal-rank fusion constant: 1 / (RRF_K + rank)
+FUSION_DEPTH = int(os.getenv("FUSION_DEPTH", "50"))  # candidates taken from each ranking before fusing
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# FAISS index built by scripts/build_index.py: flat (exact), sq8, fp16, pq, ivf_flat, ivf_pq or hnsw
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = ~4*sqrt(n)
+PQ_M = int(os.getenv("PQ_M", "16"))  # sub-quantizers; must divide the embedding dim (384)
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+NPROBE = int(os.getenv("NPROBE", "16"))  # IVF lists scanned per query, persisted in meta
+EF_SEARCH = int(os.getenv("EF_SEARCH", "64"))  # HNSW search breadth, persisted in meta
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))  # quantized indexes: candidates per hit rescored in float32, <=1 = off
+RELOAD_INTERVAL = float(os.getenv("RELOAD_INTERVAL", "10"))  # seconds between index file checks, 0 = never hot-reload
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # X-Admin-Token required by POST /admin/reload; empty = endpoint disabled
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "64"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "0"))  # seconds, 0 = never expire
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0"))  # seconds, 0 = never expire
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "")  # e.g. ./data/response_cache.sqlite; empty = memory only
+
+GEN_CONCURRENCY = int(os.getenv("GEN_CONCURRENCY", "8"))
+
+GENERATOR = os.getenv("GENERATOR", "gemini")  # "stub" = offline fallback answers, no API calls
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))  # simulated LLM latency for the stub
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds; for streams, the longest wait for any one chunk
+LLM_STREAM_TIMEOUT = float(os.getenv("LLM_STREAM_TIMEOUT", "120"))  # seconds for a whole streamed answer
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+WARMUP = os.getenv("WARMUP", "1") == "1"  # API: load model + store and run a dummy query before reporting ready
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+DEBUG_TIMINGS = os.getenv("DEBUG_TIMINGS", "0") == "1"  # default for requests: per-stage ms in ChatResponse.debug
+PROFILE_RATE = float(os.getenv("PROFILE_RATE", "0"))  # share of chat requests run under cProfile, 0 = only on request
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")  # write .prof files here (snakeviz / pstats); empty = summary in debug only
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "1") == "1"  # tracemalloc peak while a profiled request runs
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "15"))  # functions listed in debug.profile
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "0") == "1"  # let any client force profiling with X-Profile: 1
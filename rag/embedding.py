@@ -1,15 +1,161 @@
-from sentence_transformers import SentenceTransformer
+import json
+import logging
+import os
 import numpy as np
-from .config import EMBEDDING_MODEL
+from contextlib import contextmanager
+from typing import List
+from .cache import LRUCache
+from .lazy import lazy_import
+from .config import (EMBEDDING_MODEL, EMBED_CACHE_SIZE, EMBED_CACHE_MAX_MB, EMBED_CACHE_TTL, EMBED_BATCH_SIZE,
+                     EMBED_BACKEND, ONNX_DIR, ONNX_INT8, ONNX_THREADS)
+
+log = logging.getLogger(__name__)
+
+sentence_transformers = lazy_import("sentence_transformers")  # pulls in torch
+onnxruntime = lazy_import("onnxruntime")
+tokenizers = lazy_import("tokenizers")
+
+BACKENDS = ("torch", "onnx")
+ONNX_CONFIG = "embedding_config.json"  # written next to the .onnx files by scripts/export_onnx.py
 
 _model = None
 
+_query_cache = LRUCache(
+    max_entries=EMBED_CACHE_SIZE,
+    max_bytes=int(EMBED_CACHE_MAX_MB * 1024 * 1024),
+    ttl=EMBED_CACHE_TTL,
+    sizeof=lambda v: v.nbytes,
+)
+
+def onnx_model_path(int8: bool = ONNX_INT8, model_dir: str = ONNX_DIR) -> str:
+    return os.path.join(model_dir, "model_int8.onnx" if int8 else "model.onnx")
+
+class TorchEmbedder:
+    """SentenceTransformer on PyTorch: the reference backend, and the only one with multi-process pools."""
+
+    modules = (sentence_transformers,)
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model = sentence_transformers.SentenceTransformer(model_name)
+        self.key = model_name
+
+    def encode(self, texts, batch_size: int = EMBED_BATCH_SIZE, pool=None) -> np.ndarray:
+        if pool is not None:
+            embs = self.model.encode_multi_process(texts, pool, batch_size=batch_size, normalize_embeddings=True)
+        else:
+            embs = self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+        return np.array(embs, dtype="float32")
+
+    def start_pool(self, workers: int):
+        return self.model.start_multi_process_pool(["cpu"] * workers)
+
+    def stop_pool(self, pool):
+        self.model.stop_multi_process_pool(pool)
+
+class OnnxEmbedder:
+    """The exported transformer on ONNX Runtime; mean pooling and L2 normalization are done in NumPy.
+
+    No torch in the process: a worker holds the ONNX session (int8 weights are ~4x smaller) and
+    a Rust tokenizer, and single-query encodes skip the PyTorch dispatch overhead.
+    """
+
+    modules = (onnxruntime, tokenizers)
+
+    def __init__(self, path: str = ""):
+        path = path or onnx_model_path()
+        model_dir = os.path.dirname(path)
+        with open(os.path.join(model_dir, ONNX_CONFIG), "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        if cfg["model"] != EMBEDDING_MODEL:
+            raise ValueError(f"{path} was exported from {cfg['model']}, but EMBEDDING_MODEL is {EMBEDDING_MODEL}")
+        opts = onnxruntime.SessionOptions()
+        if ONNX_THREADS > 0:
+            opts.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = tokenizers.Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=cfg["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=cfg["pad_id"], pad_token=cfg["pad_token"])
+        self.dim = cfg["dim"]
+        self.key = f"{EMBEDDING_MODEL}@onnx/{os.path.basename(path)}"
+
+    def encode(self, texts, batch_size: int = EMBED_BATCH_SIZE, pool=None) -> np.ndarray:
+        texts = list(texts)
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        # longest first, as SentenceTransformer does, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            enc = self.tokenizer.encode_batch([texts[i] for i in rows])
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+            tokens = self.session.run(None, {k: v for k, v in feed.items() if k in self.inputs})[0]
+            m = mask[:, :, None].astype(np.float32)
+            pooled = (tokens * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+            out[rows] = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return out
+
+def _backend_class():
+    if EMBED_BACKEND not in BACKENDS:
+        raise ValueError(f"EMBED_BACKEND must be one of {BACKENDS}, got {EMBED_BACKEND!r}")
+    return OnnxEmbedder if EMBED_BACKEND == "onnx" else TorchEmbedder
+
+def backend_modules():
+    # the heavy imports behind the configured backend, for the API warm-up
+    return _backend_class().modules
+
+def embedder_key() -> str:
+    # identifies the vectors this backend produces; build caches made by another backend are discarded
+    if EMBED_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL}@onnx/{os.path.basename(onnx_model_path())}"
+    return EMBEDDING_MODEL
+
 def get_embedder():
     global _model
     if _model is None:
-        _model = SentenceTransformer(EMBEDDING_MODEL)
+        _model = _backend_class()()
     return _model
 
-def encode_texts(texts):
-    embs = get_embedder().encode(texts, normalize_embeddings=True)
-    return np.array(embs, dtype="float32")
+def encode_texts(texts, batch_size: int = EMBED_BATCH_SIZE, pool=None):
+    return get_embedder().encode(texts, batch_size=batch_size, pool=pool)
+
+@contextmanager
+def encode_pool(workers: int):
+    # one encoder process per CPU worker for index builds; yields None (in-process) when workers <= 0
+    if workers <= 0:
+        yield None
+        return
+    model = get_embedder()
+    if not hasattr(model, "start_pool"):
+        # ONNX Runtime already spreads one call over intra-op threads
+        log.warning("EMBED_BACKEND=%s has no multi-process pool; encoding in-process", EMBED_BACKEND)
+        yield None
+        return
+    pool = model.start_pool(workers)
+    try:
+        yield pool
+    finally:
+        model.stop_pool(pool)
+
+def normalize_query(text: str) -> str:
+    # all-MiniLM-L6-v2 lowercases and splits on whitespace itself, so this does not change the embedding
+    return " ".join(text.split()).lower()
+
+def encode_queries(queries: List[str]) -> np.ndarray:
+    keys = [normalize_query(q) for q in queries]
+    vecs = [_query_cache.get(k) for k in keys]
+    missing = sorted({k for k, v in zip(keys, vecs) if v is None})
+    if missing:
+        fresh = dict(zip(missing, encode_texts(missing)))
+        for k, v in fresh.items():
+            v.setflags(write=False)
+            _query_cache.put(k, v)
+        vecs = [fresh[k] if v is None else v for k, v in zip(keys, vecs)]
+    return np.stack(vecs) if vecs else np.empty((0, 0), dtype="float32")
+
+def embedding_cache_stats() -> dict:
+    return _query_cache.stats()
+
+def clear_embedding_cache():
+    _query_cache.clear()
@@ -1,6 +1,15 @@
-import google.generativeai as genai
-from typing import List
-from .config import GEMINI_API_KEY
+import asyncio
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterable, Iterator, List
+from .lazy import lazy_import
+from .metrics import span
+from .config import GEMINI_API_KEY, GENERATOR, STUB_LATENCY_MS, LLM_CONCURRENCY, LLM_TIMEOUT, LLM_STREAM_TIMEOUT
+
+genai = lazy_import("google.generativeai")
+
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
 
 def get_gemini():
     if not GEMINI_API_KEY:
@@ -8,6 +17,9 @@ def get_gemini():
     genai.configure(api_key=GEMINI_API_KEY)
     return genai.GenerativeModel("gemini-1.5-pro")
 
+def use_gemini() -> bool:
+    return bool(GEMINI_API_KEY) and GENERATOR != "stub"
+
 SYSTEM_STYLE = """You are an HR assistant. 
 Return concise, helpful recommendations. 
 Cite concrete skills, years, project/domain signals, and availability. 
@@ -26,19 +38,18 @@ def build_prompt(user_query: str, items: List[dict]) -> str:
     lines.append("Now produce a natural response with rationale and suggestions.")
     return "\n".join(lines)
 
-def generate_answer(user_query: str, retrieved_items):
-    if not GEMINI_API_KEY:
-        bullets = []
-        for it in retrieved_items:
-            e = it.employee
-            bullets.append(
-                f"- {e.name} ({e.experience_years} yrs) — skills: {', '.join(e.skills)}; "
-                f"projects: {', '.join(e.projects)}; availability: {e.availability}"
-            )
-        text = "\n".join(bullets) or "No candidates found."
-        return f"(Gemini disabled) Candidates:\n{text}"
-
-    model = get_gemini()
+def fallback_answer(retrieved_items) -> str:
+    bullets = []
+    for it in retrieved_items:
+        e = it.employee
+        bullets.append(
+            f"- {e.name} ({e.experience_years} yrs) — skills: {', '.join(e.skills)}; "
+            f"projects: {', '.join(e.projects)}; availability: {e.availability}"
+        )
+    text = "\n".join(bullets) or "No candidates found."
+    return f"(Gemini disabled) Candidates:\n{text}"
+
+def prompt_for(user_query: str, retrieved_items) -> str:
     items = []
     for it in retrieved_items:
         items.append({
@@ -46,6 +57,109 @@ def generate_answer(user_query: str, retrieved_items):
             "score": it.score,
             "reasons": it.reasons
         })
-    prompt = build_prompt(user_query, items)
-    resp = model.generate_content(prompt)
+    return build_prompt(user_query, items)
+
+def generate_answer(user_query: str, retrieved_items):
+    if not use_gemini():
+        with span("llm"):
+            if STUB_LATENCY_MS:
+                time.sleep(STUB_LATENCY_MS / 1000)
+            return fallback_answer(retrieved_items)
+
+    with span("prompt"):
+        prompt = prompt_for(user_query, retrieved_items)
+    with span("llm"):
+        resp = get_gemini().generate_content(prompt)
     return resp.text.strip()
+
+async def generate_answer_async(user_query: str, retrieved_items) -> str:
+    # LLM_CONCURRENCY bounds in-flight calls per process; LLM_TIMEOUT raises asyncio.TimeoutError
+    async with _llm_slots:
+        if not use_gemini():
+            with span("llm"):
+                if STUB_LATENCY_MS:
+                    await asyncio.sleep(STUB_LATENCY_MS / 1000)
+                return fallback_answer(retrieved_items)
+
+        with span("prompt"):
+            prompt = prompt_for(user_query, retrieved_items)
+        with span("llm"):
+            resp = await asyncio.wait_for(get_gemini().generate_content_async(prompt), timeout=LLM_TIMEOUT)
+        return resp.text.strip()
+
+def _stub_chunks(text: str) -> List[str]:
+    return [w + " " for w in text.split(" ")]
+
+def _iter_with_deadline(open_stream: Callable[[], Iterable], timeout: float, total: float) -> Iterator:
+    # a blocking stream read on a daemon thread, so the caller can stop waiting: each item, the first included,
+    # gets `timeout` seconds capped by what is left of `total`, else TimeoutError. Once the caller stops,
+    # the reader drops the stream after its current item
+    items, stop = queue.Queue(), threading.Event()
+    done = object()
+
+    def read():
+        try:
+            for item in open_stream():
+                if stop.is_set():
+                    return
+                items.put(item)
+            items.put(done)
+        except BaseException as e:
+            items.put(e)
+
+    threading.Thread(target=read, name="llm-stream", daemon=True).start()
+    deadline = time.monotonic() + total
+    try:
+        while True:
+            try:
+                item = items.get(timeout=max(0.0, min(timeout, deadline - time.monotonic())))
+            except queue.Empty:
+                raise TimeoutError("LLM stream stalled") from None
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def stream_answer(user_query: str, retrieved_items) -> Iterator[str]:
+    if not use_gemini():
+        yield from _stub_chunks(fallback_answer(retrieved_items))
+        return
+
+    with span("prompt"):
+        prompt = prompt_for(user_query, retrieved_items)
+    # the same deadlines as stream_answer_async: LLM_TIMEOUT per chunk wait, LLM_STREAM_TIMEOUT for the answer.
+    # "llm" covers the whole stream, including time the consumer spends between chunks
+    with span("llm"):
+        chunks = _iter_with_deadline(lambda: get_gemini().generate_content(prompt, stream=True),
+                                     LLM_TIMEOUT, LLM_STREAM_TIMEOUT)
+        for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
+
+async def stream_answer_async(user_query: str, retrieved_items) -> AsyncIterator[str]:
+    async with _llm_slots:
+        if not use_gemini():
+            for piece in _stub_chunks(fallback_answer(retrieved_items)):
+                yield piece
+            return
+
+        with span("prompt"):
+            prompt = prompt_for(user_query, retrieved_items)
+        # every wait, the first response and each later chunk, gets LLM_TIMEOUT, capped by what is left of
+        # LLM_STREAM_TIMEOUT; a stalled stream raises asyncio.TimeoutError instead of holding its store lease
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LLM_STREAM_TIMEOUT
+        budget = lambda: max(0.0, min(LLM_TIMEOUT, deadline - loop.time()))
+        with span("llm"):
+            resp = await asyncio.wait_for(get_gemini().generate_content_async(prompt, stream=True), timeout=budget())
+            chunks = resp.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=budget())
+                except StopAsyncIteration:
+                    break
+                if chunk.text:
+                    yield chunk.text
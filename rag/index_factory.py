@@ -0,0 +1,114 @@
+from __future__ import annotations
+import math
+import numpy as np
+from typing import Dict, Optional
+from .lazy import lazy_import
+from .config import INDEX_TYPE, IVF_NLIST, PQ_M, PQ_NBITS, HNSW_M, HNSW_EF_CONSTRUCTION, NPROBE, EF_SEARCH
+
+INDEX_TYPES = ("flat", "sq8", "fp16", "pq", "ivf_flat", "ivf_pq", "hnsw")
+TRAINED_TYPES = ("sq8", "pq", "ivf_flat", "ivf_pq")  # sized from the row count and trained before vectors are added
+QUANTIZED_TYPES = ("sq8", "fp16", "pq", "ivf_pq")  # lossy codes; builds keep float32 vectors for rescoring
+
+faiss = lazy_import("faiss")
+
+def _nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, never more lists than training points
+    nlist = IVF_NLIST or int(4 * math.sqrt(max(n, 1)))
+    return max(1, min(nlist, n))
+
+def _pq_m(d: int) -> int:
+    m = PQ_M
+    while m > 1 and d % m:
+        m -= 1
+    return m
+
+def _pq_nbits(n: int) -> int:
+    # 2**nbits centroids per sub-quantizer; small corpora cannot train 256
+    return max(1, min(PQ_NBITS, int(math.log2(max(n, 2)))))
+
+def new_index(d: int, n: int, kind: str = INDEX_TYPE) -> faiss.Index:
+    # every index type takes caller-assigned int64 ids via add_with_ids
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(d))
+    if kind == "sq8":
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT))
+    if kind == "fp16":
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT))
+    if kind == "pq":
+        return faiss.IndexIDMap2(faiss.IndexPQ(d, _pq_m(d), _pq_nbits(n), faiss.METRIC_INNER_PRODUCT))
+    if kind == "ivf_flat":
+        return faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, _nlist(n), faiss.METRIC_INNER_PRODUCT)
+    if kind == "ivf_pq":
+        return faiss.IndexIVFPQ(faiss.IndexFlatIP(d), d, _nlist(n), _pq_m(d), _pq_nbits(n), faiss.METRIC_INNER_PRODUCT)
+    if kind == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return faiss.IndexIDMap2(hnsw)
+    raise ValueError(f"Unknown INDEX_TYPE {kind!r}; expected one of {', '.join(INDEX_TYPES)}")
+
+def train_size(n: int, kind: str = INDEX_TYPE) -> int:
+    # rows buffered before training a streamed build; 0 = the index needs no training
+    if kind == "ivf_flat":
+        return min(n, 50 * _nlist(n))
+    if kind == "ivf_pq":
+        return min(n, max(50 * _nlist(n), 40 * 2 ** PQ_NBITS))
+    if kind == "sq8":
+        return min(n, 65536)  # per-dimension min/max
+    if kind == "pq":
+        return min(n, max(65536, 40 * 2 ** PQ_NBITS))
+    return 0
+
+def default_search_params(kind: str = INDEX_TYPE) -> Dict[str, int]:
+    if kind in ("ivf_flat", "ivf_pq"):
+        return {"nprobe": NPROBE}
+    if kind == "hnsw":
+        return {"efSearch": EF_SEARCH}
+    return {}
+
+def set_search_params(index: faiss.Index, params: Optional[Dict[str, int]]):
+    space = faiss.ParameterSpace()
+    for name, value in (params or {}).items():
+        space.set_index_parameter(index, name, value)
+
+def build_index(X: np.ndarray, ids: np.ndarray, kind: str = INDEX_TYPE) -> faiss.Index:
+    index = new_index(X.shape[1], len(X), kind)
+    if not index.is_trained:
+        index.train(X)
+    index.add_with_ids(X, ids)
+    set_search_params(index, default_search_params(kind))
+    return index
+
+def supports_remove(index: faiss.Index) -> bool:
+    # incremental builds need caller-assigned ids (IDMap2 or IVF) and removal; HNSW graphs cannot
+    # drop nodes and bare legacy flat indexes have no add_with_ids, so both are rebuilt from cached embeddings
+    if isinstance(index, faiss.IndexIVF):
+        return True
+    if not isinstance(index, faiss.IndexIDMap2):
+        return False
+    return not isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+
+def supports_selector(index: faiss.Index) -> bool:
+    # IndexPQ rejects SearchParameters; callers scan the selected rows exactly instead
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    return not isinstance(inner, faiss.IndexPQ)
+
+def id_selector(ids: np.ndarray, id_space: int) -> faiss.IDSelector:
+    # few ids: hashed batch; otherwise one bit per id in [0, id_space)
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if len(ids) * 64 < id_space:
+        return faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+    mask = np.zeros(id_space, dtype=bool)
+    mask[ids] = True
+    bits = np.packbits(mask, bitorder="little")  # faiss tests bit (id & 7) of byte id >> 3
+    sel = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+    sel.referenced_objects = [bits]  # the selector only holds a pointer
+    return sel
+
+def search_parameters(index: faiss.Index, sel: faiss.IDSelector) -> faiss.SearchParameters:
+    # IVF and HNSW only accept their own parameter class, so carry the current knobs over
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=index.nprobe)
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=sel)
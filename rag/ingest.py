@@ -0,0 +1,99 @@
+import json
+from typing import Iterator
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+READ_SIZE = 1 << 16
+
+def is_jsonl(path: str) -> bool:
+    return path.lower().endswith(JSONL_SUFFIXES)
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    # one employee object per line; blank lines are skipped
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON ({e.msg})") from None
+
+class _StreamDecoder:
+    """Pulls JSON values off a text file one at a time, keeping only a small read buffer."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        # next non-whitespace character, "" at end of file
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} in {self.f.name}, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # value runs past the buffer; read more, or it is genuinely malformed
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next read
+            if end == len(self.buf) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_array(path: str, key: str = "employees") -> Iterator[dict]:
+    # incremental parse of {"<key>": [ {...}, {...} ]}: one array element in memory at a time
+    with open(path, "r", encoding="utf-8") as f:
+        s = _StreamDecoder(f)
+        s.expect("{")
+        while s.peek() != "}":
+            name = s.value()
+            s.expect(":")
+            if name != key:
+                s.value()  # other top-level fields are parsed and discarded
+            else:
+                s.expect("[")
+                while s.peek() != "]":
+                    yield s.value()
+                    if s.peek() == ",":
+                        s.expect(",")
+                s.expect("]")
+                return
+            if s.peek() == ",":
+                s.expect(",")
+        raise ValueError(f"{path} has no {key!r} array")
+
+def iter_employees(path: str) -> Iterator[dict]:
+    return iter_jsonl(path) if is_jsonl(path) else iter_json_array(path)
+
+def count_employees(path: str) -> int:
+    # cheap first pass for builds that need the roster size up front (IVF list count)
+    if is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+    return sum(1 for _ in iter_json_array(path))
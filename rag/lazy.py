@@ -0,0 +1,32 @@
+import importlib
+from types import ModuleType
+
+class LazyModule:
+    """Stands in for a heavy module (torch via sentence_transformers, faiss, scipy) until first use.
+
+    Importing rag then costs milliseconds; the real import happens on the first attribute access,
+    which the API's warm-up phase triggers deliberately so it shows up in the startup log.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            # the import system serializes concurrent first imports of the same module
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (loaded)'}>"
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,90 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .config import BM25_K1, BM25_B
+from .lazy import lazy_import
+
+sp = lazy_import("scipy.sparse")
+
+# words, numbers and tech tokens kept whole: c++, c#, node.js, e-commerce, scikit-learn
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*[+#]*")
+
+# arrays stored in the column bundle: a (rows x terms) CSC matrix of BM25 weights plus its term strings
+BM25_ARRAYS = ("bm25_data", "bm25_indices", "bm25_indptr", "bm25_terms_blob", "bm25_terms_offsets")
+
+def tokenize(text: str) -> List[str]:
+    # "5+" in a query is the number 5; "c++" keeps its pluses
+    return [t.rstrip("+") if t[0].isdigit() else t for t in TOKEN_RE.findall(text.lower())]
+
+def build_bm25(texts) -> Dict[str, np.ndarray]:
+    # weights are precomputed per (row, term), so a query is one sparse column slice and a sum
+    from .columns import StringColumn
+
+    vocab: Dict[str, int] = {}
+    doc_ids, term_ids, tfs = [], [], []
+    lengths = np.zeros(len(texts), dtype=np.float64)
+    for row in range(len(texts)):
+        tokens = tokenize(texts[row])
+        lengths[row] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            doc_ids.append(row)
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            tfs.append(tf)
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    tf = np.asarray(tfs, dtype=np.float64)
+
+    n = len(texts)
+    df = np.bincount(term_ids, minlength=len(vocab))
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[doc_ids] / max(lengths.mean() if n else 0.0, 1e-9))
+    weights = idf[term_ids] * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+    m = sp.csc_matrix((weights.astype(np.float32), (doc_ids, term_ids)), shape=(n, len(vocab)))
+    m.sort_indices()
+    terms = StringColumn.from_list(list(vocab))
+    return {
+        "bm25_data": m.data.astype(np.float32),
+        "bm25_indices": m.indices.astype(np.int32),
+        "bm25_indptr": m.indptr.astype(np.int64),
+        "bm25_terms_blob": terms.blob,
+        "bm25_terms_offsets": terms.offsets,
+    }
+
+class BM25Index:
+    """Okapi BM25 over the corpus rows, backed by the weight matrix in the column bundle."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.matrix = sp.csc_matrix(
+            (columns.derived("bm25_data"), columns.derived("bm25_indices"), columns.derived("bm25_indptr")),
+            shape=(len(columns), len(columns.derived("bm25_indptr")) - 1),
+        )
+        self._terms = None
+
+    def _term_ids(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        if self._terms is None:
+            from .columns import StringColumn
+            col = StringColumn(self.columns.derived("bm25_terms_blob"), self.columns.derived("bm25_terms_offsets"))
+            self._terms = {col[i]: i for i in range(len(col))}
+        counts = Counter(t for t in tokenize(query) if t in self._terms)
+        ids = np.fromiter((self._terms[t] for t in counts), dtype=np.int64, count=len(counts))
+        return ids, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+    def scores(self, query: str) -> np.ndarray:
+        ids, counts = self._term_ids(query)
+        if not len(ids):
+            return np.zeros(len(self.columns), dtype=np.float32)
+        return np.asarray(self.matrix[:, ids] @ counts).ravel()
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # (scores, rows) of the k best rows with any query term, best first
+        scores = self.scores(query)
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0.0)
+        rows = np.flatnonzero(scores > 0)
+        if len(rows) > k:
+            rows = np.sort(rows[np.argpartition(-scores[rows], k - 1)[:k]])
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return scores[rows], rows
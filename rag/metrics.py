@@ -0,0 +1,86 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# seconds: from a ~10µs query parse up to a slow LLM call
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGES = ("parse", "embed", "lexical", "search", "rerank", "prompt", "llm", "serialize")
+
+class Histogram:
+    """Thread-safe cumulative histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        with self._lock:
+            return {k: {"buckets": list(b), "sum": s, "count": c} for k, (b, s, c) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for values, s in sorted(self.snapshot().items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values))
+            sep = "," if labels else ""
+            cumulative = 0
+            for le, n in zip(self.buckets, s["buckets"]):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {s["count"]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {s['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {s['count']}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+stage_seconds = Histogram("rag_stage_seconds", "Time spent in each RAG pipeline stage.", ("stage",))
+request_seconds = Histogram("rag_request_seconds", "HTTP request latency by route and status.", ("route", "status"))
+
+# per-request stage totals in ms; set by collect_timings(), None outside a request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+@contextmanager
+def span(stage: str):
+    # always feeds the histogram; also adds to the current request's timings when one is being collected
+    timings = _timings.get()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        stage_seconds.observe(dt, stage)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + dt * 1000, 3)
+
+def render_metrics() -> str:
+    return "\n".join(stage_seconds.render() + request_seconds.render()) + "\n"
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from .config import MAX_TOP_K
 
 class Employee(BaseModel):
     id: str
@@ -11,11 +12,19 @@ class Employee(BaseModel):
 
 class SearchQuery(BaseModel):
     query: str
-    top_k: int = 5
+    top_k: int = Field(default=5, ge=1, le=MAX_TOP_K)
 
 class ChatQuery(BaseModel):
     message: str
-    top_k: int = 5
+    top_k: int = Field(default=5, ge=1, le=MAX_TOP_K)
+    hard_filters: Optional[bool] = None  # None = HARD_FILTERS setting
+    timings: Optional[bool] = None  # None = DEBUG_TIMINGS setting
+
+class BatchChatQuery(BaseModel):
+    messages: List[str]
+    top_k: int = Field(default=5, ge=1, le=MAX_TOP_K)
+    hard_filters: Optional[bool] = None
+    timings: Optional[bool] = None
 
 class RetrievedItem(BaseModel):
     employee: Employee
@@ -27,3 +36,6 @@ class ChatResponse(BaseModel):
     results: List[RetrievedItem]
     used_hybrid: bool
     debug: Optional[Dict[str, Any]] = None
+
+class BatchChatResponse(BaseModel):
+    responses: List[ChatResponse]
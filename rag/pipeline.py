@@ -1,24 +1,209 @@
-from .store import VectorStore
-from .retriever import hybrid_retrieve
-from .generator import generate_answer
-from .models import ChatResponse
-
-_store = None
-
-def get_store():
-    global _store
-    if _store is None:
-        _store = VectorStore()
-        _store.load()
-    return _store
-
-def rag_chat(message: str, top_k: int = 5) -> ChatResponse:
-    store = get_store()
-    retrieved, debug = hybrid_retrieve(message, store, top_k=top_k)
+import asyncio
+import contextvars
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from .store import StoreManager, VectorStore
+from .retriever import hybrid_retrieve, hybrid_retrieve_batch
+from .generator import generate_answer, generate_answer_async, stream_answer, stream_answer_async
+from .embedding import normalize_query
+from .cache import LRUCache, SQLiteTier
+from .metrics import collect_timings
+from .profiling import profiling, profile_thread, should_profile
+from .models import ChatResponse, RetrievedItem
+from .config import GEN_CONCURRENCY, CPU_WORKERS, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_DB, DEBUG_TIMINGS
+
+_stores = StoreManager()
+
+# encoding + FAISS search are CPU-bound; keep them off the event loop and off FastAPI's default threadpool
+_cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="rag-cpu")
+
+_answer_cache = LRUCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+_answer_db = SQLiteTier(RESPONSE_CACHE_DB) if RESPONSE_CACHE_DB else None
+
+def _profiled(fn, *args):
+    with profile_thread():
+        return fn(*args)
+
+def _run_cpu(fn, *args):
+    # runs in a copy of the caller's context so stage spans and the profiler inside fn reach the request
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(_cpu_executor, contextvars.copy_context().run, _profiled, fn, *args)
+
+def _attach_timings(debug: Dict, spent: Dict[str, float], timings: Optional[bool]):
+    if DEBUG_TIMINGS if timings is None else timings:
+        debug["timings_ms"] = dict(spent)
+
+def _attach_profile(debug: Dict, summary: Dict):
+    if summary:
+        debug["profile"] = summary
+
+def get_store() -> VectorStore:
+    return _stores.current()
+
+def store_lease():
+    # hold for the whole request so a hot reload never closes the store mid-query
+    return _stores.acquire()
+
+def reload_store(force: bool = True, blocking: bool = True) -> Optional[bool]:
+    # None: blocking=False and a reload was already running
+    return _stores.reload(force=force, blocking=blocking)
+
+def store_status() -> dict:
+    return _stores.status()
+
+def response_cache_key(message: str, top_k: int, retrieved: List[RetrievedItem], version: str) -> str:
+    payload = [normalize_query(message), top_k, [it.employee.id for it in retrieved], version]
+    return hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()
+
+def _lookup_answer(key: str, version: str):
+    answer = _answer_cache.get(key)
+    if answer is None and _answer_db is not None:
+        answer = _answer_db.get(key, version, ttl=RESPONSE_CACHE_TTL)
+        if answer is not None:
+            _answer_cache.put(key, answer)
+    return answer
+
+def _remember_answer(key: str, version: str, answer: str):
+    _answer_cache.put(key, answer)
+    if _answer_db is not None:
+        _answer_db.put(key, version, answer)
+
+def cached_answer(message: str, top_k: int, retrieved: List[RetrievedItem], store: VectorStore):
+    key = response_cache_key(message, top_k, retrieved, store.version)
+    answer = _lookup_answer(key, store.version)
+    if answer is not None:
+        return answer, True
     answer = generate_answer(message, retrieved)
-    return ChatResponse(
-        answer=answer,
-        results=retrieved,
-        used_hybrid=True,
-        debug=debug
-    )
+    _remember_answer(key, store.version, answer)
+    return answer, False
+
+async def cached_answer_async(message: str, top_k: int, retrieved: List[RetrievedItem], store: VectorStore):
+    key = response_cache_key(message, top_k, retrieved, store.version)
+    answer = _lookup_answer(key, store.version)
+    if answer is not None:
+        return answer, True
+    answer = await generate_answer_async(message, retrieved)
+    _remember_answer(key, store.version, answer)
+    return answer, False
+
+def response_cache_stats() -> dict:
+    return _answer_cache.stats()
+
+def rag_chat(message: str, top_k: int = 5, hard_filters: Optional[bool] = None,
+             timings: Optional[bool] = None, profile: Optional[bool] = None) -> ChatResponse:
+    with store_lease() as store, collect_timings() as spent:
+        with profiling(should_profile(profile)) as prof:
+            retrieved, debug = hybrid_retrieve(message, store, top_k=top_k, hard_filters=hard_filters)
+            answer, hit = cached_answer(message, top_k, retrieved, store)
+        debug["answer_cached"] = hit
+        _attach_timings(debug, spent, timings)
+        _attach_profile(debug, prof)
+        return ChatResponse(
+            answer=answer,
+            results=retrieved,
+            used_hybrid=True,
+            debug=debug
+        )
+
+def rag_chat_batch(messages: List[str], top_k: int = 5, hard_filters: Optional[bool] = None,
+                   timings: Optional[bool] = None, profile: Optional[bool] = None) -> List[ChatResponse]:
+    # timings and the profile cover the whole batch
+    with store_lease() as store, collect_timings() as spent:
+        with profiling(should_profile(profile)) as prof:
+            # one encode call and one multi-row FAISS search for the whole batch
+            hits = hybrid_retrieve_batch(messages, store, top_k=top_k, hard_filters=hard_filters)
+            if not hits:
+                return []
+            jobs = [(contextvars.copy_context(), m, h[0]) for m, h in zip(messages, hits)]
+            with ThreadPoolExecutor(max_workers=max(1, min(GEN_CONCURRENCY, len(hits)))) as ex:
+                answers = list(ex.map(lambda j: j[0].run(_profiled, cached_answer, j[1], top_k, j[2], store), jobs))
+        out = []
+        for (answer, hit), (retrieved, debug) in zip(answers, hits):
+            debug["answer_cached"] = hit
+            _attach_timings(debug, spent, timings)
+            _attach_profile(debug, prof)
+            out.append(ChatResponse(answer=answer, results=retrieved, used_hybrid=True, debug=debug))
+        return out
+
+async def rag_chat_async(message: str, top_k: int = 5, hard_filters: Optional[bool] = None,
+                         timings: Optional[bool] = None, profile: Optional[bool] = None) -> ChatResponse:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_cpu_executor, get_store)
+    with store_lease() as store, collect_timings() as spent:
+        # the event loop thread also runs other requests, so only the CPU-pool work is profiled
+        with profiling(should_profile(profile), this_thread=False) as prof:
+            retrieved, debug = await _run_cpu(hybrid_retrieve, message, store, top_k, hard_filters)
+            answer, hit = await cached_answer_async(message, top_k, retrieved, store)
+        debug["answer_cached"] = hit
+        _attach_timings(debug, spent, timings)
+        _attach_profile(debug, prof)
+        return ChatResponse(answer=answer, results=retrieved, used_hybrid=True, debug=debug)
+
+async def rag_chat_batch_async(messages: List[str], top_k: int = 5, hard_filters: Optional[bool] = None,
+                               timings: Optional[bool] = None, profile: Optional[bool] = None) -> List[ChatResponse]:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_cpu_executor, get_store)
+    with store_lease() as store, collect_timings() as spent:
+        with profiling(should_profile(profile), this_thread=False) as prof:
+            hits = await _run_cpu(hybrid_retrieve_batch, messages, store, top_k, hard_filters)
+            answers = await asyncio.gather(*(cached_answer_async(m, top_k, h[0], store) for m, h in zip(messages, hits)))
+        out = []
+        for (answer, hit), (retrieved, debug) in zip(answers, hits):
+            debug["answer_cached"] = hit
+            _attach_timings(debug, spent, timings)
+            _attach_profile(debug, prof)
+            out.append(ChatResponse(answer=answer, results=retrieved, used_hybrid=True, debug=debug))
+        return out
+
+def _results_event(retrieved: List[RetrievedItem], debug: Dict) -> Tuple[str, Dict]:
+    return "results", {"results": [r.model_dump() for r in retrieved], "debug": debug}
+
+def rag_chat_stream(message: str, top_k: int = 5, hard_filters: Optional[bool] = None,
+                    timings: Optional[bool] = None) -> Iterator[Tuple[str, Dict]]:
+    # events: ("results", ...) as soon as retrieval is done, then ("token", ...) chunks, then ("done", ...)
+    # streamed answers report retrieval timings only: the results event goes out before generation starts
+    with store_lease() as store:
+        with collect_timings() as spent:
+            retrieved, debug = hybrid_retrieve(message, store, top_k=top_k, hard_filters=hard_filters)
+        _attach_timings(debug, spent, timings)
+        yield _results_event(retrieved, debug)
+
+        key = response_cache_key(message, top_k, retrieved, store.version)
+        answer = _lookup_answer(key, store.version)
+        hit = answer is not None
+        if hit:
+            yield "token", {"text": answer}
+        else:
+            parts = []
+            for piece in stream_answer(message, retrieved):
+                parts.append(piece)
+                yield "token", {"text": piece}
+            answer = "".join(parts).strip()
+            _remember_answer(key, store.version, answer)
+        yield "done", {"answer": answer, "answer_cached": hit}
+
+async def rag_chat_stream_async(message: str, top_k: int = 5, hard_filters: Optional[bool] = None,
+                                timings: Optional[bool] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_cpu_executor, get_store)
+    with store_lease() as store:
+        with collect_timings() as spent:
+            retrieved, debug = await _run_cpu(hybrid_retrieve, message, store, top_k, hard_filters)
+        _attach_timings(debug, spent, timings)
+        yield _results_event(retrieved, debug)
+
+        key = response_cache_key(message, top_k, retrieved, store.version)
+        answer = _lookup_answer(key, store.version)
+        hit = answer is not None
+        if hit:
+            yield "token", {"text": answer}
+        else:
+            parts = []
+            async for piece in stream_answer_async(message, retrieved):
+                parts.append(piece)
+                yield "token", {"text": piece}
+            answer = "".join(parts).strip()
+            _remember_answer(key, store.version, answer)
+        yield "done", {"answer": answer, "answer_cached": hit}
@@ -0,0 +1,132 @@
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+from .config import PROFILE_RATE, PROFILE_DIR, PROFILE_MEMORY, PROFILE_TOP
+
+class _Session:
+    """One profiled request: a cProfile per thread it ran on, merged when the request ends."""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self.lock = threading.Lock()
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self.lock:
+            profiles = [p for p in self.profiles if p.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for p in profiles[1:]:
+            stats.add(p)
+        return stats
+
+_session: ContextVar[Optional[_Session]] = ContextVar("rag_profile", default=None)
+
+# tracemalloc is process-wide; it runs while any profiled request is in flight
+_tracing = 0
+_tracing_lock = threading.Lock()
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    # explicit request wins; otherwise sample PROFILE_RATE of calls
+    if requested is not None:
+        return requested
+    return PROFILE_RATE > 0 and random.random() < PROFILE_RATE
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    # profiles the calling thread if it works for a profiled request; a no-op otherwise
+    session = _session.get()
+    if session is None or _active_profiler():
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        with session.lock:
+            session.profiles.append(prof)
+
+def _active_profiler() -> bool:
+    # cProfile cannot nest: a thread already profiled further up the stack keeps its profiler
+    return sys.getprofile() is not None
+
+def _start_tracing():
+    global _tracing
+    with _tracing_lock:
+        if _tracing == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing += 1
+        tracemalloc.reset_peak()
+
+def _stop_tracing() -> int:
+    global _tracing
+    with _tracing_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _tracing -= 1
+        if _tracing == 0:
+            tracemalloc.stop()
+        return peak
+
+def _summary(stats: Optional[pstats.Stats], wall: float) -> Dict:
+    out: Dict = {"wall_ms": round(wall * 1000, 3)}
+    if stats is None:
+        return out
+    out["cpu_ms"] = round(stats.total_tt * 1000, 3)
+    # hottest functions by self time; cumulative time is dominated by the pipeline's own wrappers
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:PROFILE_TOP]
+    out["top"] = [
+        {"function": f"{os.path.basename(file)}:{line}({name})", "calls": nc,
+         "self_ms": round(tt * 1000, 3), "cum_ms": round(ct * 1000, 3)}
+        for (file, line, name), (cc, nc, tt, ct, _) in rows
+    ]
+    return out
+
+def _dump(stats: pstats.Stats) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+    stats.dump_stats(path)
+    return path
+
+@contextmanager
+def profiling(enabled: bool, this_thread: bool = True) -> Iterator[Dict]:
+    """Profile the enclosed request; the yielded dict is filled with its summary on exit.
+
+    Worker threads join through profile_thread(), which needs this context (copy_context() carries it).
+    this_thread=False leaves the calling thread alone, e.g. an event loop shared with other requests.
+    """
+    summary: Dict = {}
+    if not enabled:
+        yield summary
+        return
+    session = _Session()
+    token = _session.set(session)
+    if PROFILE_MEMORY:
+        _start_tracing()
+    t0 = time.perf_counter()
+    try:
+        if this_thread:
+            with profile_thread():
+                yield summary
+        else:
+            yield summary
+    finally:
+        wall = time.perf_counter() - t0
+        _session.reset(token)
+        stats = session.stats()
+        summary.update(_summary(stats, wall))
+        if PROFILE_MEMORY:
+            # peak over the whole process while this request ran, so concurrent requests count too
+            summary["alloc_peak_kb"] = round(_stop_tracing() / 1024, 1)
+        if PROFILE_DIR and stats is not None:
+            summary["dump"] = _dump(stats)
@@ -1,80 +1,246 @@
+import contextvars
 import re
-from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import numpy as np
-from .embedding import encode_texts
+from .embedding import encode_queries
 from .store import VectorStore
-from .models import RetrievedItem, Employee
-from .config import TOP_K
+from .models import RetrievedItem
+from .taxonomy import default_taxonomy
+from .metrics import span
+from .profiling import profile_thread
+from .config import TOP_K, HARD_FILTERS, FUSION, RRF_K, FUSION_DEPTH, CPU_WORKERS
 
-SKILL_WORDS = set([
-    "python","java","aws","docker","react","react native","pytorch","tensorflow",
-    "ml","machine learning","nlp","kubernetes","gcp","azure","sql","node","go",
-    "scala","spark","pandas","scikit-learn","flask","fastapi"
-])
+_taxonomy = default_taxonomy()
+SKILL_WORDS = _taxonomy.canonical["skills"]
+DOMAINS = _taxonomy.canonical["domains"]
+
+YEARS_RE = re.compile(r"(\d+)\s*\+?\s*(?:years?|yrs?|y)(?![a-z0-9])")
 
 def parse_query(query: str) -> Dict:
     q = query.lower()
 
     years = None
-    m = re.search(r'(\d+)\s*\+?\s*(?:years|yrs|y)', q)
+    m = YEARS_RE.search(q)
     if m:
         years = int(m.group(1))
 
-    skills = []
-    for w in SKILL_WORDS:
-        if w in q:
-            skills.append(w)
+    skills, availability, domain = [], None, None
+    for kind, name in _taxonomy.match(q):
+        if kind == "skills":
+            if name not in skills:
+                skills.append(name)
+        elif kind == "availability":
+            availability = availability or name
+        elif domain is None:
+            domain = name
 
-    availability = None
-    if "available" in q:
-        availability = "available"
+    return {"years": years, "skills": skills, "availability": availability, "domain": domain}
 
-    domain = None
-    for d in ["healthcare","fintech","e-commerce","ecommerce","gaming","education","devops"]:
-        if d in q:
-            domain = d
-            break
+# hybrid score = cosine similarity + these boosts
+SKILL_BOOST = 0.05
+AVAILABILITY_BOOST = 0.05
+YEARS_BOOST = 0.07
+DOMAIN_BOOST = 0.06
+
+def _has_bit(bits: np.ndarray, j: int) -> np.ndarray:
+    return (bits[:, j >> 3] & (128 >> (j & 7))) != 0
+
+def max_boost(parsed: Dict) -> float:
+    # the most any candidate can gain for this query; bounds what an unseen, less similar candidate can reach
+    return (SKILL_BOOST * len(parsed["skills"] or [])
+            + (AVAILABILITY_BOOST if parsed["availability"] == "available" else 0.0)
+            + (YEARS_BOOST if parsed["years"] is not None else 0.0)
+            + (DOMAIN_BOOST if parsed["domain"] else 0.0))
+
+def constraint_mask(parsed: Dict, store: VectorStore) -> Optional[np.ndarray]:
+    # hard-filter form of the boosts: rows with any parsed skill, enough years, availability and the domain
+    return store.attrs.constraint_bitmap(
+        skills=parsed["skills"],
+        min_years=parsed["years"],
+        availability=parsed["availability"],
+        project_term=parsed["domain"],
+    )
+
+def _score(parsed: Dict, sims: np.ndarray, rows: np.ndarray, store: VectorStore):
+    # boosts are added in the same order as the scalar rules so float sums match exactly
+    cols = store.columns
+    score = sims.astype(np.float64)
+    hits = []
+
+    for s in parsed["skills"] or []:
+        mask = cols.skill_mask(_taxonomy.skill_matcher(s))
+        m = (cols.skill_bits[rows] & mask).any(axis=1)
+        score += SKILL_BOOST * m
+        hits.append((m, f"skill:{s}"))
+
+    if parsed["availability"] == "available":
+        m = cols.avail_mask(lambda a: a.lower() == "available")[cols.avail_codes[rows]]
+        score += AVAILABILITY_BOOST * m
+        hits.append((m, "availability:available"))
+
+    if parsed["years"] is not None:
+        m = cols.years[rows] >= parsed["years"]
+        score += YEARS_BOOST * m
+        hits.append((m, f"years>={parsed['years']}"))
+
+    if parsed["domain"]:
+        bits = cols.project_term_bits(DOMAINS, _taxonomy.project_matcher)
+        m = _has_bit(bits[rows], DOMAINS.index(parsed["domain"]))
+        score += DOMAIN_BOOST * m
+        hits.append((m, f"domain:{parsed['domain']}"))
+
+    return score, hits
+
+def rerank(query: str, dists: np.ndarray, idxs: np.ndarray, store: VectorStore, top_k: int = TOP_K,
+           parsed: Optional[Dict] = None) -> Tuple[List[RetrievedItem], Dict]:
+    # dists are inner products of normalized vectors, i.e. cosine similarities (higher is closer)
+    parsed = parsed or parse_query(query)
+
+    keep = idxs != -1
+    rows = idxs[keep].astype(np.int64)
+    score, hits = _score(parsed, dists[keep], rows, store)
+
+    order = np.argsort(-score, kind="stable")[:top_k]
+    out = [
+        RetrievedItem(
+            employee=store.get_employee(int(rows[i])),
+            score=round(float(score[i]), 4),
+            reasons=[r for m, r in hits if m[i]],
+        )
+        for i in order
+    ]
+    debug = {"parsed_query": parsed, "raw_hits": int(len(rows))}
+    return out, debug
 
-    return {"years": years, "skills": skills, "availability": availability, "domain": domain}
+def _settled(parsed: Dict, dists: np.ndarray, rows: np.ndarray, k: int, store: VectorStore, top_k: int) -> bool:
+    keep = rows != -1
+    if keep.sum() < k:
+        # the index has nothing more to return (corpus, filter or IVF probe budget exhausted)
+        return True
+    score, _ = _score(parsed, dists[keep], rows[keep], store)
+    kth = np.partition(score, len(score) - top_k)[len(score) - top_k]
+    # FAISS returns hits by descending similarity, so every unseen row is at most as similar as the last one
+    return float(dists[keep][-1]) + max_boost(parsed) <= kth
+
+# adaptive over-fetch: after this many rounds, or once the doubled window would pass this share of the
+# searchable rows, the next round fetches all of them. A flat index scans every row whatever k is, so
+# doubling up to the corpus size would mean several full scans where one does.
+ADAPTIVE_MAX_ROUNDS = 4
+ADAPTIVE_FULL_FRACTION = 0.25
+
+def adaptive_search(vecs: np.ndarray, parsed: List[Dict], store: VectorStore, top_k: int,
+                    allowed: Optional[np.ndarray] = None):
+    # start at top_k and double the window (up to one full fetch, see above) until no unseen candidate
+    # can reach the hybrid top-k; returns (dists, rows, rounds, k) per query
+    limit = store.index.ntotal if allowed is None else int(allowed.sum())
+    k = max(1, min(top_k, limit))
+    out = [None] * len(vecs)
+    pending, rounds = list(range(len(vecs))), 0
+    while pending:
+        rounds += 1
+        dists, rows = store.search_batch(vecs[pending], k, allowed)
+        still = []
+        for j, qi in enumerate(pending):
+            out[qi] = (dists[j], rows[j], rounds, k)
+            if k < limit and not _settled(parsed[qi], dists[j], rows[j], k, store, top_k):
+                still.append(qi)
+        full = rounds + 1 >= ADAPTIVE_MAX_ROUNDS or k * 2 > ADAPTIVE_FULL_FRACTION * limit
+        pending, k = still, limit if full else k * 2
+    return out
+
+# BM25 runs here while the calling thread encodes the query and searches FAISS
+_lexical_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="bm25")
+
+def rrf_fuse(rankings: List[np.ndarray], k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    # rows ordered by the sum of 1 / (k + rank) over the rankings they appear in, rank counted from 1
+    rankings = [r for r in rankings if len(r)]
+    if not rankings:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    rows = np.concatenate(rankings)
+    contrib = np.concatenate([1.0 / (k + np.arange(1, len(r) + 1)) for r in rankings])
+    uniq, inverse = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inverse, weights=contrib)
+    order = np.argsort(-fused, kind="stable")
+    return uniq[order], fused[order]
+
+def _fused(query: str, parsed: Dict, found, lexical, store: VectorStore, top_k: int) -> Tuple[List[RetrievedItem], Dict]:
+    dists, rows, rounds, k = found
+    keep = rows != -1
+    rows = rows[keep].astype(np.int64)
+    score, _ = _score(parsed, dists[keep], rows, store)
+    dense = rows[np.argsort(-score, kind="stable")]
+    _, lexical_rows = lexical
+
+    fused_rows, fused = rrf_fuse([dense, lexical_rows])
+    top = fused_rows[:top_k]
+    # boosts only supply reasons here; the ranking is the fused one
+    _, hits = _score(parsed, np.zeros(len(top)), top, store)
+    from_bm25 = np.isin(top, lexical_rows)
+    out = [
+        RetrievedItem(
+            employee=store.get_employee(int(row)),
+            score=round(float(fused[i]), 4),
+            reasons=[r for m, r in hits if m[i]] + (["bm25"] if from_bm25[i] else []),
+        )
+        for i, row in enumerate(top)
+    ]
+    debug = {"parsed_query": parsed, "raw_hits": int(len(rows)), "rounds": rounds, "fetch_k": k,
+             "fusion": "rrf", "lexical_hits": int(len(lexical_rows))}
+    return out, debug
 
-def hybrid_retrieve(query: str, store: VectorStore, top_k: int = TOP_K) -> Tuple[List[RetrievedItem], Dict]:
-    dense_vec = encode_texts([query])
-    dists, idxs = store.search(dense_vec, max(top_k*3, top_k))
-    candidates = []
-    parsed = parse_query(query)
-
-    for dist, idx in zip(dists, idxs):
-        if idx == -1:
-            continue
-        emp_raw = store.get_employee_by_idx(int(idx))
-        emp = Employee(**emp_raw)
-        text = store.get_text_by_idx(int(idx))
-
-        reasons = []
-        score = float(1.0 - dist)
-
-        for s in parsed["skills"] or []:
-            if any(s in k.lower() for k in emp.skills):
-                score += 0.05
-                reasons.append(f"skill:{s}")
-
-        if parsed["availability"] == "available" and emp.availability.lower() == "available":
-            score += 0.05
-            reasons.append("availability:available")
-
-        if parsed["years"] is not None and emp.experience_years >= parsed["years"]:
-            score += 0.07
-            reasons.append(f"years>={parsed['years']}")
-
-        if parsed["domain"]:
-            joined_projects = " ".join([p.lower() for p in emp.projects])
-            if parsed["domain"] in joined_projects:
-                score += 0.06
-                reasons.append(f"domain:{parsed['domain']}")
-
-        candidates.append((score, emp, reasons))
-
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    out = [RetrievedItem(employee=e, score=round(s, 4), reasons=r) for s, e, r in candidates[:top_k]]
-    debug = {"parsed_query": parsed, "raw_hits": len(candidates)}
+def _retrieve(query: str, parsed: Dict, found, lexical, store: VectorStore, top_k: int) -> Tuple[List[RetrievedItem], Dict]:
+    if lexical is not None:
+        return _fused(query, parsed, found, lexical, store, top_k)
+    dists, rows, rounds, k = found
+    out, debug = rerank(query, dists, rows, store, top_k, parsed)
+    debug["rounds"] = rounds
+    debug["fetch_k"] = k
     return out, debug
+
+def _lexical_search(store: VectorStore, query: str, depth: int, allowed):
+    with span("lexical"), profile_thread():
+        return store.lexical.search(query, depth, allowed)
+
+def hybrid_retrieve(query: str, store: VectorStore, top_k: int = TOP_K,
+                    hard_filters: Optional[bool] = None) -> Tuple[List[RetrievedItem], Dict]:
+    return hybrid_retrieve_batch([query], store, top_k, hard_filters)[0]
+
+def hybrid_retrieve_batch(queries: List[str], store: VectorStore, top_k: int = TOP_K,
+                          hard_filters: Optional[bool] = None) -> List[Tuple[List[RetrievedItem], Dict]]:
+    if not queries:
+        return []
+    hard = HARD_FILTERS if hard_filters is None else hard_filters
+    with span("parse"):
+        parsed = [parse_query(q) for q in queries]
+        allowed = [constraint_mask(p, store) for p in parsed] if hard else [None] * len(queries)
+    fuse = FUSION == "rrf"
+    # with fusion each side contributes a deeper ranking than the final top_k
+    depth = max(top_k, FUSION_DEPTH) if fuse else top_k
+    # the BM25 threads run in a copy of this context so their spans land in the caller's timings
+    lexical = [_lexical_pool.submit(contextvars.copy_context().run, _lexical_search, store, q, depth, a)
+               if fuse else None for q, a in zip(queries, allowed)]
+
+    with span("embed"):
+        dense_vecs = encode_queries(queries)
+    with span("search"):
+        if hard:
+            # each query has its own selector, so these search one query at a time;
+            # the selector is applied inside the FAISS scan, so every hit already satisfies the constraints
+            empty = (np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), 0, 0)
+            found = [adaptive_search(dense_vecs[i:i + 1], [p], store, depth, a)[0] if a is None or a.any() else empty
+                     for i, (p, a) in enumerate(zip(parsed, allowed))]
+        else:
+            # queries still unsettled after a round are searched again together with a doubled window
+            found = adaptive_search(dense_vecs, parsed, store, depth)
+    lexical = [lex.result() if lex is not None else None for lex in lexical]
+
+    out = []
+    with span("rerank"):
+        for q, p, f, lex, a in zip(queries, parsed, found, lexical, allowed):
+            items, debug = _retrieve(q, p, f, lex, store, top_k)
+            if hard:
+                debug["hard_filters"] = True
+                debug["filtered_rows"] = None if a is None else int(a.sum())
+            out.append((items, debug))
+    return out
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from .config import TOP_K, EMBED_BACKEND
+
+log = logging.getLogger(__name__)
+
+class Startup:
+    """Startup phases and their durations; the process is ready once warm-up has run.
+
+    Liveness only needs the event loop to answer. Readiness waits for the heavy imports,
+    the embedding model, the first inference and the vector store, so a load balancer does
+    not send the first user request into a cold process.
+    """
+
+    def __init__(self):
+        self.status = "starting"  # starting -> warming -> ready | failed
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = round(seconds, 3)
+        log.info("startup %-12s %8.3fs", name, seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        yield
+        self.record(name, time.perf_counter() - t0)
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def mark_ready(self):
+        self.status = "ready"
+        log.info("startup complete in %.3fs: %s", sum(self.phases.values()),
+                 ", ".join(f"{k}={v:.3f}s" for k, v in self.phases.items()))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"status": self.status, "phases": dict(self.phases),
+                    "total_s": round(sum(self.phases.values()), 3), "error": self.error}
+
+    def warm_up(self):
+        # each phase forces one deferred cost so the log shows where cold-start time goes
+        from .embedding import backend_modules, get_embedder, encode_texts
+        from .store import faiss
+        from .pipeline import get_store
+
+        self.status = "warming"
+        try:
+            with self.phase("import_faiss"):
+                faiss.load()
+            with self.phase(f"import_{EMBED_BACKEND}"):
+                for module in backend_modules():
+                    module.load()
+            with self.phase("load_model"):
+                get_embedder()
+            with self.phase("first_encode"):
+                # encode_texts, not encode_queries, so the query cache is not seeded with the probe
+                vec = encode_texts(["warm up"])
+            with self.phase("load_store"):
+                store = get_store()
+            with self.phase("first_search"):
+                if len(store.columns):
+                    store.search(vec, min(TOP_K, len(store.columns)))
+                    store.lexical.scores("warm up")  # builds the BM25 term lookup
+        except Exception as e:
+            self.status = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            log.exception("Warm-up failed; the process stays unready")
+            return
+        self.mark_ready()
+
+startup = Startup()
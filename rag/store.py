@@ -1,31 +1,296 @@
 import json
-import faiss
+import logging
+import os
+import threading
+from contextlib import contextmanager
 import numpy as np
-from typing import List, Tuple
-from .config import INDEX_PATH, META_PATH
+from typing import Iterator, List, Optional, Tuple
+from .config import INDEX_PATH, META_PATH, COLUMNS_DIR, MMAP_INDEX, RELOAD_INTERVAL, RESCORE_FACTOR
+from .columns import CURRENT_FILE, EmployeeColumns, has_bundle
+from .attr_index import AttributeIndex
+from .lexical import BM25Index
+from .index_factory import set_search_params, supports_selector, id_selector, search_parameters
+from .models import Employee
+from .lazy import lazy_import
+
+log = logging.getLogger(__name__)
+
+faiss = lazy_import("faiss")
+
+def file_generation(index_path: str, *optional_paths: str) -> Optional[Tuple[int, ...]]:
+    # metadata may live in meta.json, the column bundle, or both; only the index is required
+    stamp = []
+    for path in (index_path,) + optional_paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if path == index_path:
+                return None
+            stamp.extend((0, 0))
+            continue
+        stamp.extend((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+def version_path(index_path: str) -> str:
+    # sidecar naming the build an index file came from; the column bundle and meta.json record the same id
+    return index_path + ".version"
+
+def read_index_version(index_path: str) -> Optional[str]:
+    try:
+        with open(version_path(index_path), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None  # built before the sidecar existed
+
+def _file_id(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+class IndexMismatch(ValueError):
+    """The index file and the metadata on disk come from different builds (usually one still being written)."""
+
+def read_index(path: str, mmap: bool = MMAP_INDEX):
+    if mmap:
+        # IO_FLAG_MMAP maps IVF lists; IO_FLAG_MMAP_IFC (newer faiss) also maps flat/HNSW vector storage.
+        # IVF readers reject the two combined, so they retry with IO_FLAG_MMAP alone.
+        attempts = [faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY]
+        if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            attempts.insert(0, attempts[0] | faiss.IO_FLAG_MMAP_IFC)
+        for flags in attempts:
+            try:
+                return faiss.read_index(path, flags)
+            except RuntimeError:
+                continue
+        log.warning("Index %s cannot be memory-mapped; reading it into memory", path)
+    return faiss.read_index(path)
+
+def rescore(query_vecs: np.ndarray, rows: np.ndarray, vectors: np.ndarray, top_k: int):
+    # exact float32 inner products for a quantized index's candidates; only these rows of the mapped vectors are read.
+    # -1 padding (shortlist wider than the index or the filter) is never gathered and sorts last, and the
+    # result is padded to top_k columns like a FAISS search
+    if rows.shape[1] < top_k:
+        rows = np.pad(rows, ((0, 0), (0, top_k - rows.shape[1])), constant_values=-1)
+    sims = np.full(rows.shape, np.finfo(np.float32).min, dtype=np.float32)
+    for i, r in enumerate(rows):
+        valid = r != -1
+        sims[i, valid] = vectors[r[valid]] @ query_vecs[i]
+    order = np.argsort(-sims, axis=1, kind="stable")[:, :top_k]
+    return np.take_along_axis(sims, order, axis=1), np.take_along_axis(rows, order, axis=1)
 
 class VectorStore:
-    def __init__(self, index_path=INDEX_PATH, meta_path=META_PATH):
+    def __init__(self, index_path=INDEX_PATH, meta_path=META_PATH, columns_dir=COLUMNS_DIR):
         self.index_path = index_path
         self.meta_path = meta_path
+        self.columns_dir = columns_dir
         self.index = None
-        self.meta = None
+        self.columns = None
+        self.attrs = None
+        self.lexical = None
+        self.version = None
 
     def load(self):
-        self.index = faiss.read_index(self.index_path)
-        with open(self.meta_path, "r", encoding="utf-8") as f:
-            self.meta = json.load(f)
+        # build_index.py writes the version sidecar, then the index, then the metadata. Reading them in that
+        # order, with the index unchanged from start to end, means a sidecar that matches the metadata
+        # also matches the index that was read
+        index_id = _file_id(self.index_path)
+        self.index = read_index(self.index_path)
+        built_for = read_index_version(self.index_path)
+        meta = None
+        if self.columns_dir and has_bundle(self.columns_dir):
+            # memory-mapped columns: startup cost no longer grows with roster size
+            self.columns, meta = EmployeeColumns.open(self.columns_dir)
+            if len(self.columns) != self.index.ntotal:
+                log.warning("Column bundle has %d rows but index has %d vectors; falling back to %s",
+                            len(self.columns), self.index.ntotal, self.meta_path)
+                meta = None
+        if meta is None:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.columns = EmployeeColumns.from_meta(meta)
+            if len(self.columns) != self.index.ntotal:
+                raise ValueError(f"{self.meta_path} has {len(self.columns)} rows but {self.index_path} has "
+                                 f"{self.index.ntotal} vectors; rebuild with scripts.build_index")
+        if built_for is not None and built_for != meta.get("index_version"):
+            raise IndexMismatch(f"{self.index_path} is from build {built_for} but the metadata is from "
+                                f"{meta.get('index_version')}; a build may still be writing them")
+        if _file_id(self.index_path) != index_id:
+            raise IndexMismatch(f"{self.index_path} was replaced while loading")
+        params = {k: v for k, v in meta.get("index_params", {}).items() if k != "type"}
+        set_search_params(self.index, params)
+        self.attrs = AttributeIndex(self.columns)
+        self.lexical = BM25Index(self.columns)
+        self.version = meta.get("index_version") or self._file_stamp()
+
+    def _file_stamp(self) -> str:
+        # indexes built before index_version existed: fall back to file modification times
+        return "mtime-{}-{}".format(os.stat(self.index_path).st_mtime_ns, os.stat(self.meta_path).st_mtime_ns)
 
     def is_ready(self) -> bool:
-        return self.index is not None and self.meta is not None
+        return self.index is not None and self.columns is not None
+
+    def close(self):
+        self.index = None
+        self.columns = None
+        self.attrs = None
+        self.lexical = None
 
-    def search(self, query_vec: np.ndarray, top_k: int):
-        distances, indices = self.index.search(query_vec, top_k)
+    def search(self, query_vec: np.ndarray, top_k: int, allowed: Optional[np.ndarray] = None):
+        distances, indices = self.search_batch(query_vec, top_k, allowed)
         return distances[0], indices[0]
 
+    @property
+    def rescoring(self) -> bool:
+        return self.columns is not None and self.columns.vectors is not None and RESCORE_FACTOR > 1
+
+    def search_batch(self, query_vecs: np.ndarray, top_k: int, allowed: Optional[np.ndarray] = None):
+        # returns (distances, rows); rows index self.columns, -1 marks empty slots.
+        # allowed: optional bool mask over rows; only those rows are considered by the index search
+        params = None
+        if allowed is not None:
+            rows = np.flatnonzero(allowed)
+            if not supports_selector(self.index):
+                # e.g. IndexPQ: score the selected rows exactly from the stored float32 vectors
+                return rescore(query_vecs, np.broadcast_to(rows, (len(query_vecs), len(rows))), self.columns.vectors, top_k)
+            vec_ids = self.columns.vec_ids
+            params = search_parameters(self.index, id_selector(vec_ids[rows], int(vec_ids[-1]) + 1 if len(vec_ids) else 0))
+        if self.rescoring:
+            # quantized codes shortlist RESCORE_FACTOR x candidates, float32 vectors order them
+            _, ids = self.index.search(query_vecs, top_k * RESCORE_FACTOR, params=params)
+            return rescore(query_vecs, self.columns.rows_for(ids), self.columns.vectors, top_k)
+        distances, ids = self.index.search(query_vecs, top_k, params=params)
+        return distances, self.columns.rows_for(ids)
+
+    def get_employee(self, idx: int) -> Employee:
+        return self.columns.employee(idx)
+
     def get_employee_by_idx(self, idx: int) -> dict:
-        emp_id = self.meta["vec_id_to_emp_id"][str(idx)]
-        return self.meta["employees"][emp_id]
+        return self.columns.employee_dict(idx)
 
     def get_text_by_idx(self, idx: int) -> str:
-        return self.meta["vec_id_to_text"][str(idx)]
+        return self.columns.text(idx)
+
+class _Lease:
+    def __init__(self, store: VectorStore, generation):
+        self.store = store
+        self.generation = generation
+        self.refs = 0
+        self.retired = False
+
+class StoreManager:
+    """Owns the live VectorStore and swaps in a new one when build_index.py rewrites the files.
+
+    Requests hold a reference for their whole duration via acquire(); a replaced store is
+    closed only after its last in-flight request releases it.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, meta_path=META_PATH, columns_dir=COLUMNS_DIR,
+                 poll_interval=RELOAD_INTERVAL):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.columns_dir = columns_dir
+        self.poll_interval = poll_interval
+        self._lease = None
+        self._draining = []
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _generation(self):
+        return file_generation(self.index_path, version_path(self.index_path), self.meta_path,
+                               os.path.join(self.columns_dir, CURRENT_FILE))
+
+    def current(self) -> VectorStore:
+        if self._lease is None:
+            self.reload()
+            self.start_watcher()
+        return self._lease.store
+
+    @contextmanager
+    def acquire(self) -> Iterator[VectorStore]:
+        self.current()
+        with self._lock:
+            lease = self._lease
+            lease.refs += 1
+        try:
+            yield lease.store
+        finally:
+            with self._lock:
+                lease.refs -= 1
+                done = lease.retired and lease.refs == 0
+                if done:
+                    self._draining.remove(lease)
+            if done:
+                lease.store.close()
+
+    def reload(self, force: bool = False, blocking: bool = True) -> Optional[bool]:
+        # blocking=False returns None at once when another reload is already loading a store
+        if not self._reload_lock.acquire(blocking=blocking):
+            return None
+        try:
+            return self._reload(force)
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, force: bool) -> bool:
+        gen = self._generation()
+        if self._lease is not None and not force and gen == self._lease.generation:
+            return False
+        store = VectorStore(self.index_path, self.meta_path, self.columns_dir)
+        try:
+            store.load()
+        except IndexMismatch:
+            if self._lease is None:
+                raise
+            log.warning("Index files are mid-build; keeping version %s", self._lease.store.version, exc_info=True)
+            return False
+        if self._generation() != gen:
+            # files were rewritten while loading; keep the current store and retry on the next poll
+            if self._lease is not None:
+                return False
+            gen = None
+
+        with self._lock:
+            old, self._lease = self._lease, _Lease(store, gen)
+            close_old = old is not None and old.refs == 0
+            if old is not None and not close_old:
+                old.retired = True
+                self._draining.append(old)
+        if close_old:
+            old.store.close()
+        log.info("Loaded vector store version %s", store.version)
+        return True
+
+    def start_watcher(self):
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="store-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def _watch(self):
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            gen = self._generation()
+            if gen is None or gen == self._lease.generation:
+                pending = None
+                continue
+            # only reload once the files have stopped changing for a full poll interval
+            if gen != pending:
+                pending = gen
+                continue
+            try:
+                self.reload()
+            except Exception:
+                log.exception("Background index reload failed; keeping version %s", self._lease.store.version)
+            pending = None
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "index_version": self._lease.store.version if self._lease else None,
+                "in_flight": self._lease.refs if self._lease else 0,
+                "draining": [{"index_version": l.store.version, "in_flight": l.refs} for l in self._draining],
+            }
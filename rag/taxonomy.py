@@ -0,0 +1,93 @@
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from .config import TAXONOMY_PATH
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "taxonomy.json")
+KINDS = ("skills", "domains", "availability")
+
+def _trie_pattern(words: List[str]) -> str:
+    # alternation factored into a character trie, so matching cost follows the query, not the word count
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # greedy optional tail: the longest term wins, shorter ones are tried if the boundary check fails
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+class Taxonomy:
+    """Canonical skills / domains / availability terms with synonyms, matched by one compiled regex."""
+
+    def __init__(self, entries: Dict[str, Dict[str, List[str]]]):
+        self.canonical = {kind: tuple(entries.get(kind, {})) for kind in KINDS}
+        self.aliases: Dict[str, Tuple[str, str]] = {}
+        for kind in KINDS:
+            for name, synonyms in entries.get(kind, {}).items():
+                for alias in [name, *synonyms]:
+                    self.aliases[" ".join(alias.lower().split())] = (kind, name)
+        # a term must not continue into a neighbouring letter or digit: "go" not in "google", "ml" not in "html"
+        pattern = _trie_pattern(list(self.aliases)) or "(?!)"
+        self.regex = re.compile(rf"(?<![a-z0-9])(?:{pattern})(?![a-z0-9])")
+        self._entries: Dict[Tuple[str, str], Tuple[str, ...]] = {}  # (kind, skill or project entry) -> canonical names
+
+    @classmethod
+    def load(cls, path: str = "") -> "Taxonomy":
+        with open(path or DEFAULT_PATH, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, text: str) -> List[Tuple[str, str]]:
+        # (kind, canonical name) for each term in text, in order of appearance, longest match first
+        q = " ".join(text.lower().split())
+        return [self.aliases[m.group(0)] for m in self.regex.finditer(q)]
+
+    def canonical_names(self, kind: str, text: str) -> Tuple[str, ...]:
+        # canonical names of one kind named in text, e.g. ("skills", "Golang") -> ("go",),
+        # ("domains", "Medical Diagnosis Platform") -> ("healthcare",)
+        key = (kind, text)
+        names = self._entries.get(key)
+        if names is None:
+            names = tuple(dict.fromkeys(name for k, name in self.match(text) if k == kind))
+            if len(self._entries) < 65536:  # roster vocab, but free-text search terms pass through too
+                self._entries[key] = names
+        return names
+
+    def canonical_skills(self, text: str) -> Tuple[str, ...]:
+        return self.canonical_names("skills", text)
+
+    def _matcher(self, kind: str, term: str) -> Callable[[str], bool]:
+        # a term outside the taxonomy must appear in the entry as whole words
+        wanted = set(self.canonical_names(kind, term))
+        if wanted:
+            return lambda entry: not wanted.isdisjoint(self.canonical_names(kind, entry))
+        word = re.compile(rf"(?<![a-z0-9]){re.escape(' '.join(term.lower().split()))}(?![a-z0-9])")
+        return lambda entry: word.search(" ".join(entry.lower().split())) is not None
+
+    def skill_matcher(self, term: str) -> Callable[[str], bool]:
+        # predicate over employee skill entries, with the same boundaries as query parsing:
+        # "go" matches "Go" and "Golang" but not "MongoDB" or "Django"; "java" not "JavaScript"
+        return self._matcher("skills", term)
+
+    def project_matcher(self, domain: str) -> Callable[[str], bool]:
+        # predicate over project names through the domain's synonyms: "healthcare" matches
+        # "Medical Diagnosis Platform", "e-commerce" matches "Ecommerce Storefront"
+        return self._matcher("domains", domain)
+
+_default: Optional[Taxonomy] = None
+
+def default_taxonomy() -> Taxonomy:
+    # TAXONOMY_PATH, shared by query parsing and the skill and domain filters
+    global _default
+    if _default is None:
+        _default = Taxonomy.load(TAXONOMY_PATH)
+    return _default
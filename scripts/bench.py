@@ -0,0 +1,254 @@
+import argparse, http.client, json, os, platform, random, resource, socket, subprocess, sys, tempfile, shutil, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+SIZES = "1000,100000,1000000"
+
+# query shapes the chat UI sees: skills, experience, availability and domain in free text
+QUERY_TEMPLATES = [
+    "{skill} developers with {years}+ years",
+    "available {skill} engineers",
+    "who has {skill} and {skill2} experience in {domain}",
+    "{years} years {skill} {domain} projects",
+    "need someone for a {domain} project",
+]
+
+def percentiles(ms):
+    a = np.asarray(ms, dtype=np.float64)
+    return {"p50": round(float(np.percentile(a, 50)), 3), "p95": round(float(np.percentile(a, 95)), 3),
+            "p99": round(float(np.percentile(a, 99)), 3), "mean": round(float(a.mean()), 3)}
+
+def make_queries(count, seed=0):
+    from rag.retriever import SKILL_WORDS, DOMAINS
+    rng = random.Random(seed)
+    return [rng.choice(QUERY_TEMPLATES).format(
+        skill=rng.choice(SKILL_WORDS), skill2=rng.choice(SKILL_WORDS),
+        domain=rng.choice(DOMAINS), years=rng.randint(1, 9)) for _ in range(count)]
+
+def rss_mb():
+    # current resident set; /proc is Linux-only, elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+def write_roster(path, n, seed):
+    from scripts.generate_data import iter_generate, fake
+    random.seed(seed)
+    fake.seed_instance(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for emp in iter_generate(n):
+            f.write(json.dumps(emp) + "\n")
+
+def run(cmd, env):
+    # (stdout, seconds, peak RSS MB of the child) — wait4 reports the child's own rusage
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    out = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - t0
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{out[-2000:]}")
+    return out, elapsed, usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+def dataset_env(workdir, extra=None):
+    env = dict(os.environ)
+    env.update({
+        "DATA_PATH": os.path.join(workdir, "employees.jsonl"),
+        "INDEX_PATH": os.path.join(workdir, "index.faiss"),
+        "META_PATH": os.path.join(workdir, "meta.json"),
+        "COLUMNS_DIR": os.path.join(workdir, "columns"),
+        "EMB_CACHE_PATH": os.path.join(workdir, "emb_cache"),
+        "RELOAD_INTERVAL": "0",
+        "GENERATOR": "stub",
+    })
+    env.update(extra or {})
+    return env
+
+def measure_in_process(queries, top_k):
+    # runs in a fresh interpreter so load time and RSS are not skewed by the harness
+    from rag.store import VectorStore
+    from rag.retriever import hybrid_retrieve
+    from rag.embedding import encode_queries
+
+    encode_queries(["warm up the encoder"])
+    before = rss_mb()
+    t0 = time.perf_counter()
+    store = VectorStore()
+    store.load()
+    load_s = time.perf_counter() - t0
+    after = rss_mb()
+
+    for q in queries[:20]:
+        hybrid_retrieve(q, store, top_k)
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        hybrid_retrieve(q, store, top_k)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return {"load_s": round(load_s, 3), "load_rss_mb": round(after - before, 1),
+            "retrieve_ms": percentiles(lat), "retrieve_queries": len(lat)}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_ready(port, proc, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"API server not ready after {timeout}s")
+
+def drive(port, requests, concurrency):
+    # requests: list of (method, path, body); each worker keeps one keep-alive connection
+    local = threading.local()
+    def one(req):
+        method, path, body = req
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        t0 = time.perf_counter()
+        try:
+            local.conn.request(method, path, body=body and json.dumps(body),
+                               headers={"Content-Type": "application/json"} if body else {})
+            resp = local.conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+        except (OSError, http.client.HTTPException):
+            local.conn.close()
+            del local.conn
+            ok = False
+        return (time.perf_counter() - t0) * 1000, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(one, requests))
+    wall = time.perf_counter() - t0
+    lat = [ms for ms, ok in results if ok]
+    return {"rps": round(len(lat) / wall, 1), "errors": len(results) - len(lat),
+            "latency_ms": percentiles(lat) if lat else None}
+
+def bench_api(workdir, queries, args):
+    from rag.retriever import SKILL_WORDS
+    port = free_port()
+    env = dataset_env(workdir, {"STUB_LATENCY_MS": str(args.stub_latency_ms)})
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port),
+                               "--log-level", "warning"], env=env)
+    try:
+        wait_ready(port, server, args.startup_timeout)
+        rng = random.Random(1)
+        chats = [("POST", "/chat", {"message": queries[i % len(queries)], "top_k": args.top_k})
+                 for i in range(args.requests)]
+        searches = [("GET", f"/employees/search?skill={rng.choice(SKILL_WORDS).replace(' ', '%20')}"
+                     f"&min_years={rng.randint(1, 9)}&availability=available&limit=20", None)
+                    for _ in range(args.requests)]
+        drive(port, chats[:args.concurrency], args.concurrency)  # warm-up
+        return {"chat": drive(port, chats, args.concurrency),
+                "employees_search": drive(port, searches, args.concurrency)}
+    finally:
+        server.terminate()
+        server.wait()
+
+def bench_size(n, args):
+    workdir = os.path.join(args.workdir, f"n{n}")
+    os.makedirs(workdir, exist_ok=True)
+    env = dataset_env(workdir)
+    result = {"n": n}
+
+    roster = env["DATA_PATH"]
+    if not os.path.exists(roster):
+        t0 = time.perf_counter()
+        write_roster(roster, n, args.seed)
+        result["generate_s"] = round(time.perf_counter() - t0, 2)
+
+    # build from scratch so the embedding cache of an earlier run does not hide encode time
+    if os.path.exists(env["INDEX_PATH"]):
+        os.remove(env["INDEX_PATH"])
+    for path in (env["EMB_CACHE_PATH"], env["COLUMNS_DIR"]):
+        shutil.rmtree(path, ignore_errors=True)
+    _, build_s, build_rss = run([sys.executable, "-m", "scripts.build_index"], env)
+    result.update({"build_s": round(build_s, 2), "build_rows_per_s": round(n / build_s, 1),
+                   "build_peak_rss_mb": round(build_rss, 1)})
+
+    queries = make_queries(args.queries, args.seed)
+    out, _, peak = run([sys.executable, "-m", "scripts.bench", "--measure", "--queries", str(args.queries),
+                        "--top-k", str(args.top_k), "--seed", str(args.seed)], env)
+    result.update(json.loads(out.strip().splitlines()[-1]))
+    result["measure_peak_rss_mb"] = round(peak, 1)
+
+    if not args.skip_api:
+        result.update(bench_api(workdir, queries, args))
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summary_line(r):
+    line = (f"n={r['n']:>9,}  build {r['build_s']:8.1f}s ({r['build_rows_per_s']:,.0f} rows/s, {r['build_peak_rss_mb']:,.0f} MB)  "
+            f"load {r['load_s']:.2f}s +{r['load_rss_mb']:,.0f} MB  retrieve p50/p95/p99 "
+            f"{r['retrieve_ms']['p50']:.1f}/{r['retrieve_ms']['p95']:.1f}/{r['retrieve_ms']['p99']:.1f} ms")
+    if "chat" in r:
+        line += f"  /chat {r['chat']['rps']:.0f} req/s  /employees/search {r['employees_search']['rps']:.0f} req/s"
+    return line
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark: build, load, retrieval latency and API throughput")
+    parser.add_argument("--sizes", default=SIZES, help="comma-separated roster sizes")
+    parser.add_argument("--queries", type=int, default=500, help="hybrid_retrieve calls timed per size")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per API endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stub-latency-ms", type=float, default=0, help="simulated LLM latency for /chat")
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="keep rosters/indexes here (default: temp dir, removed)")
+    parser.add_argument("--out", default=None, help="write JSON results here instead of stdout")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)  # child: load + retrieve
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_in_process(make_queries(args.queries, args.seed), args.top_k)))
+        sys.exit(0)
+
+    keep = args.workdir is not None
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="hr_rag_bench_")
+    results = []
+    try:
+        for n in (int(s) for s in args.sizes.split(",")):
+            r = bench_size(n, args)
+            results.append(r)
+            print(summary_line(r), file=sys.stderr)
+    finally:
+        if not keep:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: os.environ[k] for k in ("INDEX_TYPE", "FUSION", "HARD_FILTERS", "EMBED_WORKERS",
+                                                 "EMBEDDING_MODEL", "EMBED_BACKEND", "ONNX_INT8", "RESCORE_FACTOR") if k in os.environ},
+        "args": {k: v for k, v in vars(args).items() if k not in ("measure", "out", "workdir")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,77 @@
+import argparse, json, os, shutil, tempfile, time
+from rag.columns import ColumnsBuilder, EmployeeColumns
+from scripts.build_index import build_corpus_row, content_hash
+from scripts.generate_data import generate
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def touch_rows(cols, rows=1000):
+    # what a handful of queries does after load: materialize some employees
+    step = max(1, len(cols) // rows)
+    for r in range(0, len(cols), step):
+        cols.employee(r)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pretty-printed meta.json with the binary column bundle")
+    parser.add_argument("-n", type=int, default=20000, help="synthetic employees")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    employees = generate(args.n)["employees"]
+    texts = [build_corpus_row(e) for e in employees]
+    work = tempfile.mkdtemp(prefix="bench_meta_")
+    try:
+        meta = {
+            "vec_id_to_emp_id": {str(i): e["id"] for i, e in enumerate(employees)},
+            "vec_id_to_text": {str(i): t for i, t in enumerate(texts)},
+            "employees": {e["id"]: e for e in employees},
+        }
+        meta_path = os.path.join(work, "meta.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        builder = ColumnsBuilder()
+        for i, (e, t) in enumerate(zip(employees, texts)):
+            builder.add(i, e, t, content_hash(t))
+        bundle_root = os.path.join(work, "columns")
+        os.makedirs(bundle_root)
+        bundle = builder.build().save(bundle_root, {"index_version": "bench"})
+
+        def load_json():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return EmployeeColumns.from_meta(json.load(f))
+
+        results = {"n": args.n}
+        results["json_bytes"] = os.path.getsize(meta_path)
+        results["bundle_bytes"] = dir_size(bundle)
+        results["json_load_s"], cols = timed(load_json, args.repeat)
+        results["json_load_touch_s"], _ = timed(lambda: touch_rows(load_json()), args.repeat)
+        results["bundle_mmap_load_s"], _ = timed(lambda: EmployeeColumns.open(bundle_root)[0], args.repeat)
+        results["bundle_mmap_load_touch_s"], _ = timed(lambda: touch_rows(EmployeeColumns.open(bundle_root)[0]), args.repeat)
+        results["bundle_read_load_s"], _ = timed(lambda: EmployeeColumns.open(bundle_root, mmap=False)[0], args.repeat)
+        results["size_ratio"] = round(results["json_bytes"] / results["bundle_bytes"], 2)
+        results["load_speedup_mmap"] = round(results["json_load_s"] / results["bundle_mmap_load_s"], 1)
+        results["load_speedup_read"] = round(results["json_load_s"] / results["bundle_read_load_s"], 1)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"n={results['n']}")
+        print(f"meta.json (indent=2): {results['json_bytes'] / 1e6:8.2f} MB   load {results['json_load_s'] * 1000:9.1f} ms"
+              f"   load+1k rows {results['json_load_touch_s'] * 1000:9.1f} ms")
+        print(f"column bundle:        {results['bundle_bytes'] / 1e6:8.2f} MB   load {results['bundle_mmap_load_s'] * 1000:9.1f} ms (mmap)"
+              f"   load+1k rows {results['bundle_mmap_load_touch_s'] * 1000:9.1f} ms   {results['bundle_read_load_s'] * 1000:.1f} ms (read)")
+        print(f"size {results['size_ratio']}x smaller, load {results['load_speedup_mmap']}x faster (mmap) / "
+              f"{results['load_speedup_read']}x faster (read)")
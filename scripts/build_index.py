@@ -1,35 +1,355 @@
-import json, os
+import argparse, hashlib, json, mmap, os, resource, shutil, sys, time, uuid
 import numpy as np
 import faiss
-from rag.embedding import encode_texts
-from rag.config import DATA_PATH, INDEX_PATH, META_PATH
+from rag.embedding import encode_texts, encode_pool, embedder_key
+from rag.config import (DATA_PATH, INDEX_PATH, META_PATH, COLUMNS_DIR, EMB_CACHE_PATH, INDEX_TYPE,
+                        EMBED_WORKERS, BUILD_CHUNK_SIZE)
+from rag.columns import ColumnsBuilder, EmployeeColumns, build_corpus_row, has_bundle, publish_bundle
+from rag.store import version_path
+from rag.ingest import iter_employees, count_employees
+from rag.index_factory import TRAINED_TYPES, QUANTIZED_TYPES, new_index, train_size, default_search_params, set_search_params, supports_remove
+
+# float32 rows of a quantized build, written as they are embedded and copied into the bundle's vectors.npy
+VECTORS_SPILL = os.path.join(COLUMNS_DIR, "vectors.build.tmp")
 
 def load_data():
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)["employees"]
+    # generator over DATA_PATH: JSONL, or the {"employees": [...]} layout parsed incrementally
+    return iter_employees(DATA_PATH)
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Content hash -> normalized float32 vector, kept on disk under EMB_CACHE_PATH.
+
+    The previous build's vectors are memory-mapped and found by binary search over its sorted
+    hashes; this build's vectors are appended chunk by chunk to a new cache that replaces the old
+    one in commit(). Neither is held in memory, so build memory does not grow with cached vectors.
+    A cache written by another model or backend is ignored.
+    """
+
+    def __init__(self, path=EMB_CACHE_PATH):
+        self.path = path
+        self.key = embedder_key()
+        self.hashes = self.rows = self.vectors = self._map = None  # previous build, memory-mapped
+        manifest = self._read_manifest(path)
+        if manifest and manifest.get("model") == self.key and manifest.get("rows"):
+            self.hashes = np.load(os.path.join(path, "hashes.npy"), mmap_mode="r")
+            self.rows = np.load(os.path.join(path, "rows.npy"), mmap_mode="r")
+            with open(os.path.join(path, "vectors.f32"), "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.vectors = np.frombuffer(self._map, dtype=np.float32).reshape(manifest["rows"], manifest["dim"])
+        self.tmp = path + ".tmp"
+        self._out, self._new_hashes, self._new_rows, self.dim = None, bytearray(), 0, None
+
+    @staticmethod
+    def _read_manifest(path):
+        try:
+            with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def lookup(self, hashes):
+        # (vectors, positions of hashes not in the previous cache); missing rows are left as zeros
+        if self.hashes is None or not hashes:
+            return None, list(range(len(hashes)))
+        keys = np.array([bytes.fromhex(h) for h in hashes], dtype="S20")
+        pos = np.minimum(np.searchsorted(self.hashes, keys), len(self.hashes) - 1)
+        hit = self.hashes[pos] == keys
+        X = np.zeros((len(hashes), self.vectors.shape[1]), dtype=np.float32)
+        rows = np.asarray(self.rows[pos[hit]])
+        order = np.argsort(rows)  # ascending file offsets
+        X[np.flatnonzero(hit)[order]] = self.vectors[rows[order]]
+        if hasattr(mmap, "MADV_DONTNEED"):
+            # the rows are copied out; unmap their pages (the page cache keeps them) so RSS stays per chunk
+            self._map.madvise(mmap.MADV_DONTNEED)
+        return X, np.flatnonzero(~hit).tolist()
+
+    def _open_output(self):
+        if self._out is None:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            os.makedirs(self.tmp)
+            self._out = open(os.path.join(self.tmp, "vectors.f32"), "wb")
+
+    def append(self, hashes, X):
+        self._open_output()
+        self._out.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+        self._new_hashes += b"".join(bytes.fromhex(h) for h in hashes)
+        self._new_rows += len(hashes)
+        self.dim = X.shape[1]
+
+    def commit(self):
+        # sort the new hashes (20 bytes + a row number each), then swap the cache directories
+        self._open_output()
+        self._out.close()
+        hashes = np.frombuffer(bytes(self._new_hashes), dtype="S20")
+        order = np.argsort(hashes, kind="stable")
+        np.save(os.path.join(self.tmp, "hashes.npy"), hashes[order])
+        np.save(os.path.join(self.tmp, "rows.npy"), order.astype(np.int64))
+        with open(os.path.join(self.tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"model": self.key, "rows": self._new_rows, "dim": self.dim or 0}, f)
+        self.hashes = self.rows = self.vectors = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        old = self.path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.isdir(self.path):
+            os.replace(self.path, old)
+        elif os.path.exists(self.path):
+            os.remove(self.path)  # single-file .npz cache from older builds
+        os.replace(self.tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def discard(self):
+        if self._out is not None:
+            self._out.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+def peak_rss_mb(children=False):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+class BuildStats:
+    """Rows/sec and encoder counters for one build."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = self.encoded = 0
+
+    def report(self, total=None):
+        elapsed = time.perf_counter() - self.started
+        done = f"{self.rows}/{total}" if total is not None else str(self.rows)
+        print(f"  {done} rows, {self.encoded} encoded, {self.rows / max(elapsed, 1e-9):,.0f} rows/s, "
+              f"peak RSS {peak_rss_mb():,.0f} MB")
+
+def iter_chunks(items, size=BUILD_CHUNK_SIZE):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def encode_with_cache(texts, hashes, cache, pool=None, stats=None):
+    # one chunk's vectors: cached ones read from disk, the rest encoded; all go into the new cache
+    if not texts:
+        return np.empty((0, 0), dtype="float32")
+    X, missing = cache.lookup(hashes)
+    if missing:
+        fresh = encode_texts([texts[i] for i in missing], pool=pool)  # normalized float32
+        if X is None:
+            X = np.asarray(fresh, dtype="float32")
+        else:
+            X[missing] = fresh
+    cache.append(hashes, X)
+    stats.encoded += len(missing)
+    return X
+
+def write_outputs(index, cols, next_vec_id, json_meta=False):
+    # write to temp files and rename so readers never see a half-written index or metadata.
+    # Every output records this build's version, written in the order VectorStore.load checks them:
+    # version sidecar, index, then the metadata (CURRENT switched, meta.json) so no reader pairs
+    # a new index with the previous build's rows
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    params = {"type": INDEX_TYPE, **default_search_params(INDEX_TYPE)}
 
-def build_corpus_row(e):
-    return f"{e['name']} | skills: {', '.join(e['skills'])} | exp: {e['experience_years']} years | projects: {', '.join(e['projects'])} | availability: {e['availability']}"
+    os.makedirs(COLUMNS_DIR, exist_ok=True)
+    cols.save(COLUMNS_DIR, {"index_version": version, "index_params": params, "next_vec_id": int(next_vec_id),
+                            "embedder": embedder_key()}, publish=False)
+
+    sidecar = version_path(INDEX_PATH)
+    with open(sidecar + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(sidecar + ".tmp", sidecar)
+    tmp = INDEX_PATH + ".tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, INDEX_PATH)
+    publish_bundle(COLUMNS_DIR, version)
+
+    if json_meta:
+        # legacy layout for tools that still read meta.json; the API only needs the column bundle
+        rows = range(len(cols))
+        meta = {
+            "index_version": version,
+            "index_params": params,
+            "next_vec_id": int(next_vec_id),
+            "embedder": embedder_key(),
+            "vec_id_to_emp_id": {str(int(cols.vec_ids[r])): cols.emp_ids[r] for r in rows},
+            "vec_id_to_text": {str(int(cols.vec_ids[r])): cols.texts[r] for r in rows},
+            "content_hashes": {cols.emp_ids[r]: cols.content_hash(r) for r in rows},
+            "employees": {cols.emp_ids[r]: cols.employee_dict(r) for r in rows}
+        }
+        tmp = META_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(tmp, META_PATH)
+
+def load_previous_state():
+    # (emp_id -> vec_id, emp_id -> content hash, next_vec_id, index type, embedder key) of the last build;
+    # the embedder key is None for builds that did not record it
+    if has_bundle(COLUMNS_DIR):
+        cols, manifest = EmployeeColumns.open(COLUMNS_DIR)
+        if cols.content_hashes is not None:
+            emp_ids = [cols.emp_ids[r] for r in range(len(cols))]
+            old_vec_id = dict(zip(emp_ids, cols.vec_ids.tolist()))
+            old_hashes = {emp_ids[r]: cols.content_hash(r) for r in range(len(cols))}
+            return (old_vec_id, old_hashes, manifest.get("next_vec_id"),
+                    manifest.get("index_params", {}).get("type", "flat"), manifest.get("embedder"))
+    if os.path.exists(META_PATH):
+        with open(META_PATH, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("content_hashes") is not None:
+            old_vec_id = {emp_id: int(v) for v, emp_id in meta["vec_id_to_emp_id"].items()}
+            return (old_vec_id, meta["content_hashes"], meta.get("next_vec_id"),
+                    meta.get("index_params", {}).get("type", "flat"), meta.get("embedder"))
+    return None
+
+def new_builder():
+    # quantized types keep float32 vectors for rescoring; they are spilled to disk as rows arrive
+    return ColumnsBuilder(vectors_path=VECTORS_SPILL if INDEX_TYPE in QUANTIZED_TYPES else None)
+
+def build_full(employees, n, cache, pool=None):
+    # n sizes IVF lists and progress output; None when the roster was not counted
+    # stream chunks: embed, record metadata, add to the index; only the current chunk's texts and vectors are live
+    builder, stats = new_builder(), BuildStats()
+    keep_vectors = INDEX_TYPE in QUANTIZED_TYPES
+    index, pending, to_train = None, [], train_size(n, INDEX_TYPE)
+    for chunk in iter_chunks(employees):
+        texts = [build_corpus_row(e) for e in chunk]
+        hashes = [content_hash(t) for t in texts]
+        X = encode_with_cache(texts, hashes, cache, pool, stats)
+        ids = np.arange(stats.rows, stats.rows + len(chunk), dtype="int64")
+        for v, e, t, h, x in zip(ids.tolist(), chunk, texts, hashes, X):
+            builder.add(v, e, t, h, x if keep_vectors else None)
+        stats.rows += len(chunk)
+
+        if index is None:
+            # cosine via inner product on normalized vectors; INDEX_TYPE picks exhaustive vs ANN
+            index = new_index(X.shape[1], n, INDEX_TYPE)
+        if index.is_trained:
+            index.add_with_ids(X, ids)
+        else:
+            # IVF / SQ / PQ: hold the first rows back until there are enough to train the quantizer
+            pending.append((X, ids))
+            if sum(len(p[1]) for p in pending) >= to_train:
+                _train_and_flush(index, pending)
+        stats.report(n)
+    if pending:
+        _train_and_flush(index, pending)
+    if index is None:
+        raise SystemExit(f"No employees in {DATA_PATH}")
+    set_search_params(index, default_search_params(INDEX_TYPE))
+    return index, builder.build(), stats.rows
+
+def _train_and_flush(index, pending):
+    X = np.concatenate([p[0] for p in pending])
+    ids = np.concatenate([p[1] for p in pending])
+    index.train(X)
+    index.add_with_ids(X, ids)
+    pending.clear()
+
+def build_incremental(employees, cache, pool=None):
+    # diffing against the previous build needs the whole roster
+    employees = list(employees)
+    state = load_previous_state()
+    if state is None:
+        print("Existing index predates incremental builds; doing a full build")
+        return build_full(employees, len(employees), cache, pool)
+    old_vec_id, old_hashes, next_vec_id, old_type, old_embedder = state
+    if old_embedder != embedder_key():
+        # vectors from another model or backend cannot share an index with new ones
+        print(f"Existing index was embedded with {old_embedder or 'an unrecorded model'}, not {embedder_key()}; "
+              "doing a full build")
+        return build_full(employees, len(employees), cache, pool)
+    index = faiss.read_index(INDEX_PATH)
+    if old_type != INDEX_TYPE or not supports_remove(index):
+        print(f"Rebuilding {INDEX_TYPE} index from cached embeddings (type changed, or the index cannot remove vectors or take assigned ids)")
+        return build_full(employees, len(employees), cache, pool)
+    set_search_params(index, default_search_params(INDEX_TYPE))
+
+    hashes = [content_hash(build_corpus_row(e)) for e in employees]
+
+    if next_vec_id is None:
+        next_vec_id = max(old_vec_id.values(), default=-1) + 1
+    current = {e["id"] for e in employees}
+
+    vec_ids, todo, stale = [], [], []
+    for i, (e, h) in enumerate(zip(employees, hashes)):
+        v = old_vec_id.get(e["id"])
+        if v is None:
+            v = next_vec_id
+            next_vec_id += 1
+            todo.append(i)
+        elif old_hashes.get(e["id"]) != h:
+            stale.append(v)
+            todo.append(i)
+        vec_ids.append(v)
+    removed = [v for emp_id, v in old_vec_id.items() if emp_id not in current]
+
+    if stale or removed:
+        index.remove_ids(np.array(stale + removed, dtype="int64"))
+
+    # one pass in vector-id order: every row's vector goes to the new cache (and the rescoring
+    # column), so unchanged rows are read from the old cache, or re-encoded when it lacks them
+    builder, stats, keep_vectors = new_builder(), BuildStats(), INDEX_TYPE in QUANTIZED_TYPES
+    todo = set(todo)
+    for part in iter_chunks(sorted(range(len(employees)), key=lambda i: vec_ids[i])):
+        texts = [build_corpus_row(employees[i]) for i in part]
+        X = encode_with_cache(texts, [hashes[i] for i in part], cache, pool, stats)
+        new = [j for j, i in enumerate(part) if i in todo]
+        if new:
+            index.add_with_ids(X[new], np.array([vec_ids[part[j]] for j in new], dtype="int64"))
+        for i, t, x in zip(part, texts, X):
+            builder.add(vec_ids[i], employees[i], t, hashes[i], x if keep_vectors else None)
+        stats.rows += len(part)
+        stats.report(len(employees))
+
+    added = len(todo) - len(stale)
+    print(f"Incremental update: {added} added, {len(stale)} changed, {len(removed)} removed, "
+          f"{len(employees) - len(todo)} unchanged")
+    return index, builder.build(), next_vec_id
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS index and metadata from employee data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-encode new/changed employees and drop deleted ones from the existing index")
+    parser.add_argument("--json-meta", action="store_true",
+                        help=f"also write the legacy {META_PATH} (the API reads the column bundle)")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS,
+                        help="encoder processes (SentenceTransformer multi-process pool); 0 = encode in this process")
+    args = parser.parse_args()
+
     os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    os.makedirs(COLUMNS_DIR, exist_ok=True)
 
+    t0 = time.perf_counter()
     employees = load_data()
-    texts = [build_corpus_row(e) for e in employees]
-    X = encode_texts(texts)  # normalized float32
-
-    d = X.shape[1]
-    index = faiss.IndexFlatIP(d)   # cosine via inner product on normalized vectors
-    index.add(X)
-
-    faiss.write_index(index, INDEX_PATH)
+    cache = EmbeddingCache()
 
-    meta = {
-        "vec_id_to_emp_id": {str(i): e["id"] for i, e in enumerate(employees)},
-        "vec_id_to_text": {str(i): texts[i] for i in range(len(texts))},
-        "employees": { e["id"]: e for e in employees }
-    }
-    with open(META_PATH, "w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
+    try:
+        with encode_pool(args.workers) as pool:
+            if args.incremental and os.path.exists(INDEX_PATH):
+                index, cols, next_vec_id = build_incremental(employees, cache, pool)
+            else:
+                # IVF needs the row count before the first vector; other types stream in a single pass
+                n = count_employees(DATA_PATH) if INDEX_TYPE in TRAINED_TYPES else None
+                index, cols, next_vec_id = build_full(employees, n, cache, pool)
+        write_outputs(index, cols, next_vec_id, json_meta=args.json_meta)
+    except BaseException:
+        cache.discard()
+        raise
+    finally:
+        if os.path.exists(VECTORS_SPILL):
+            os.remove(VECTORS_SPILL)
+    cache.commit()
 
-    print(f"Built index -> {INDEX_PATH} and meta -> {META_PATH}")
+    elapsed = time.perf_counter() - t0
+    print(f"Built index -> {INDEX_PATH} and metadata columns -> {COLUMNS_DIR}"
+          + (f" (+ {META_PATH})" if args.json_meta else ""))
+    print(f"{len(cols)} rows in {elapsed:.1f}s ({len(cols) / max(elapsed, 1e-9):,.0f} rows/s), "
+          f"peak RSS {peak_rss_mb():,.0f} MB" + (f" + {peak_rss_mb(children=True):,.0f} MB largest encoder worker" if args.workers > 0 else ""))
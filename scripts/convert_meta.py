@@ -0,0 +1,35 @@
+import argparse, json, os
+from rag.columns import ColumnsBuilder
+from rag.config import META_PATH, COLUMNS_DIR
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a legacy meta.json into the binary column bundle")
+    parser.add_argument("--meta", default=META_PATH)
+    parser.add_argument("--out", default=COLUMNS_DIR)
+    args = parser.parse_args()
+
+    with open(args.meta, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    vec_to_emp, vec_to_text = meta["vec_id_to_emp_id"], meta["vec_id_to_text"]
+    # content hashes only when meta.json recorded them: hashing the texts here would vouch for vectors
+    # nobody checked, and without them the next --incremental build does a full rebuild
+    hashes = meta.get("content_hashes")
+    vec_ids = sorted(int(k) for k in vec_to_emp)
+    builder = ColumnsBuilder()
+    for v in vec_ids:
+        emp_id = vec_to_emp[str(v)]
+        builder.add(v, meta["employees"][emp_id], vec_to_text[str(v)], hashes.get(emp_id) if hashes else None)
+
+    # old files have no index_version; stamp one derived from the file so the API's caches key on it
+    version = meta.get("index_version") or f"converted-{os.stat(args.meta).st_mtime_ns}"
+    manifest = {
+        "index_version": version,
+        "index_params": meta.get("index_params", {"type": "flat"}),
+        "next_vec_id": meta.get("next_vec_id", vec_ids[-1] + 1 if vec_ids else 0),
+    }
+    if meta.get("embedder"):
+        manifest["embedder"] = meta["embedder"]
+    os.makedirs(args.out, exist_ok=True)
+    path = builder.build().save(args.out, manifest)
+    print(f"Converted {len(vec_ids)} rows from {args.meta} -> {path}")
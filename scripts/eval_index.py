@@ -0,0 +1,104 @@
+import argparse, json, time
+import numpy as np
+import faiss
+from rag.config import COLUMNS_DIR, RESCORE_FACTOR
+from rag.columns import EmployeeColumns
+from rag.index_factory import INDEX_TYPES, QUANTIZED_TYPES, build_index, set_search_params
+from rag.store import rescore
+from scripts.build_index import EmbeddingCache
+
+# search-time knob swept for each index type
+SWEEPS = {
+    "flat": [{}],
+    "sq8": [{}],
+    "fp16": [{}],
+    "pq": [{}],
+    "ivf_flat": [{"nprobe": p} for p in (1, 4, 8, 16, 32, 64)],
+    "ivf_pq": [{"nprobe": p} for p in (1, 4, 8, 16, 32, 64)],
+    "hnsw": [{"efSearch": ef} for ef in (16, 32, 64, 128, 256)],
+}
+
+def load_vectors():
+    cols, _ = EmployeeColumns.open(COLUMNS_DIR)
+    X, missing = EmbeddingCache().lookup([cols.content_hash(r) for r in range(len(cols))])
+    if missing:
+        raise SystemExit(f"{len(missing)} rows are not in the embedding cache; run scripts.build_index first")
+    return X
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / float(len(truth) * k)
+
+def timed_search(index, Q, k, X=None):
+    # one query per call, as the API searches; with X, rescore a wider shortlist in float32 like VectorStore
+    lat, found = [], []
+    for q in Q:
+        t0 = time.perf_counter()
+        if X is None:
+            _, I = index.search(q[None, :], k)
+        else:
+            _, I = index.search(q[None, :], k * RESCORE_FACTOR)
+            _, I = rescore(q[None, :], I, X, k)
+        lat.append((time.perf_counter() - t0) * 1000)
+        found.append(I[0])
+    return found, np.percentile(lat, 50), np.percentile(lat, 99)
+
+def index_bytes(index):
+    return len(faiss.serialize_index(index))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k vs latency for each FAISS index type on the current corpus")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("-k", type=int, default=15, help="hits compared (hybrid_retrieve fetches top_k, doubling as needed)")
+    parser.add_argument("--queries", type=int, default=500, help="corpus vectors reused as queries, with noise")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    X = load_vectors()
+    ids = np.arange(len(X), dtype="int64")
+    rng = np.random.default_rng(0)
+    Q = X[rng.choice(len(X), size=min(args.queries, len(X)), replace=False)]
+    Q = Q + rng.normal(scale=args.noise, size=Q.shape).astype("float32")
+    faiss.normalize_L2(Q)
+
+    exact = build_index(X, ids, "flat")
+    truth, _, _ = timed_search(exact, Q, args.k)
+    flat_bytes = index_bytes(exact)
+    vectors_bytes = X.nbytes  # the bundle's float32 vectors.npy, which rescoring keeps beside the index
+
+    rows = []
+    for kind in args.types.split(","):
+        t0 = time.perf_counter()
+        index = build_index(X, ids, kind)
+        build_s = time.perf_counter() - t0
+        size = index_bytes(index)
+        for params in SWEEPS[kind]:
+            set_search_params(index, params)
+            modes = [False, True] if kind in QUANTIZED_TYPES and RESCORE_FACTOR > 1 else [False]
+            for rescored in modes:
+                found, p50, p99 = timed_search(index, Q, args.k, X if rescored else None)
+                recall = recall_at_k(found, truth, args.k)
+                total = size + (vectors_bytes if rescored else 0)
+                rows.append({
+                    "type": kind, **params, "rescored": rescored,
+                    f"recall@{args.k}": round(recall, 4),
+                    "recall_lost": round(1.0 - recall, 4),
+                    "p50_ms": round(float(p50), 4), "p99_ms": round(float(p99), 4),
+                    "index_mb": round(size / 1e6, 2),
+                    "vectors_mb": round(vectors_bytes / 1e6, 2) if rescored else 0.0,
+                    "memory_saved": round(1.0 - total / flat_bytes, 4),
+                    "build_s": round(build_s, 3),
+                })
+
+    if args.json:
+        print(json.dumps({"n": len(X), "queries": len(Q), "k": args.k, "results": rows}, indent=2))
+    else:
+        print(f"n={len(X)} queries={len(Q)} k={args.k} flat index={flat_bytes / 1e6:.2f}MB")
+        for r in rows:
+            knob = ", ".join(f"{k}={v}" for k, v in r.items() if k in ("nprobe", "efSearch")) or "-"
+            knob += f" +rescore x{RESCORE_FACTOR}" if r["rescored"] else ""
+            print(f"{r['type']:<9} {knob:<24} recall@{args.k}={r[f'recall@{args.k}']:.4f}  "
+                  f"p50={r['p50_ms']:.3f}ms  p99={r['p99_ms']:.3f}ms  "
+                  f"index={r['index_mb']:.2f}MB" + (f"+vectors={r['vectors_mb']:.2f}MB" if r["rescored"] else "")
+                  + f" ({r['memory_saved']:+.0%} saved)  build={r['build_s']:.2f}s")
@@ -0,0 +1,142 @@
+import argparse, json, os, sys, time
+import numpy as np
+from rag.config import EMBEDDING_MODEL, ONNX_DIR, DATA_PATH, EMBED_BATCH_SIZE
+from rag.embedding import ONNX_CONFIG, OnnxEmbedder, TorchEmbedder, onnx_model_path
+
+# short chat-style queries: the per-query latency that matters for /chat
+QUERIES = [
+    "python developers with 3+ years",
+    "available react native engineers",
+    "who has aws and docker experience in healthcare",
+    "5 years java fintech projects",
+    "ml engineer with pytorch, available now",
+    "k8s devops people",
+    "need someone for an e-commerce project",
+    "golang backend 8+ yrs",
+]
+
+def export(out_dir, opset=17):
+    # the transformer alone goes to ONNX; mean pooling and normalization stay in OnnxEmbedder.encode
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    pooling = st[1].get_pooling_mode_str() if len(st) > 1 else "?"
+    if pooling != "mean":
+        raise SystemExit(f"{EMBEDDING_MODEL} uses {pooling} pooling; the ONNX backend implements mean pooling only")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)  # tokenizer.json is read by the Rust tokenizers library at runtime
+    sample = tokenizer(["export sample text"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(names, inputs))).last_hidden_state
+
+    path = onnx_model_path(int8=False, model_dir=out_dir)
+    axes = {n: {0: "batch", 1: "seq"} for n in names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(LastHiddenState(transformer), tuple(sample[n] for n in names), path,
+                          input_names=names, output_names=["last_hidden_state"], dynamic_axes=axes,
+                          opset_version=opset, do_constant_folding=True)
+
+    cfg = {
+        "model": EMBEDDING_MODEL,
+        "max_seq_length": st.max_seq_length,
+        "dim": st.get_sentence_embedding_dimension(),
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "pooling": pooling,
+        "opset": opset,
+    }
+    with open(os.path.join(out_dir, ONNX_CONFIG), "w", encoding="utf-8") as f:
+        json.dump(cfg, f, indent=2)
+    return path
+
+def quantize(src, dst):
+    # dynamic quantization: int8 weights, activations quantized per call; no calibration data needed
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    return dst
+
+def sample_texts(n):
+    # parity is checked on queries and on the corpus rows the index is actually built from
+    texts = list(QUERIES)
+    if n and os.path.exists(DATA_PATH):
+        from rag.ingest import iter_employees
+        from scripts.build_index import build_corpus_row
+        for i, e in enumerate(iter_employees(DATA_PATH)):
+            if i >= n:
+                break
+            texts.append(build_corpus_row(e))
+    return texts
+
+def query_latency_ms(embedder, repeats=5):
+    # median single-query encode, the /chat path (the query cache is bypassed here)
+    embedder.encode(QUERIES[:1])
+    lat = []
+    for _ in range(repeats):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            embedder.encode([q])
+            lat.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(lat))
+
+def parity(paths, texts, batch_size=EMBED_BATCH_SIZE):
+    ref_model = TorchEmbedder()
+    ref = ref_model.encode(texts, batch_size=batch_size)
+    rows = [{"backend": "torch", "path": None, "min_cosine": 1.0, "mean_cosine": 1.0,
+             "query_ms": round(query_latency_ms(ref_model), 3), "size_mb": None}]
+    for path in paths:
+        model = OnnxEmbedder(path)
+        cos = np.sum(ref * model.encode(texts, batch_size=batch_size), axis=1)  # both sides are unit length
+        rows.append({"backend": "onnx", "path": path, "min_cosine": round(float(cos.min()), 6),
+                     "mean_cosine": round(float(cos.mean()), 6), "query_ms": round(query_latency_ms(model), 3),
+                     "size_mb": round(os.path.getsize(path) / 2**20, 1)})
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (+int8) and check parity with PyTorch")
+    parser.add_argument("--out", default=ONNX_DIR, help="output directory (ONNX_DIR)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no-int8", action="store_true", help="skip the int8-quantized copy")
+    parser.add_argument("--check-only", action="store_true", help="do not export; check the existing files")
+    parser.add_argument("--samples", type=int, default=500, help="roster rows from DATA_PATH added to the parity set")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="fail if any text falls below this")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    fp32 = onnx_model_path(int8=False, model_dir=args.out)
+    int8 = onnx_model_path(int8=True, model_dir=args.out)
+    if not args.check_only:
+        t0 = time.perf_counter()
+        export(args.out, args.opset)
+        if not args.no_int8:
+            quantize(fp32, int8)
+        print(f"Exported {EMBEDDING_MODEL} to {args.out} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    paths = [p for p in (fp32, int8) if os.path.exists(p) and (p == fp32 or not args.no_int8)]
+    if not paths:
+        raise SystemExit(f"No ONNX model in {args.out}; run without --check-only first")
+    texts = sample_texts(args.samples)
+    rows = parity(paths, texts)
+    failed = [r for r in rows if r["min_cosine"] < args.min_cosine]
+
+    if args.json:
+        print(json.dumps({"model": EMBEDDING_MODEL, "texts": len(texts), "min_cosine": args.min_cosine,
+                          "results": rows, "passed": not failed}, indent=2))
+    else:
+        print(f"{'model':<22} {'min cos':>9} {'mean cos':>9} {'query ms':>9} {'MB':>7}")
+        for r in rows:
+            name = os.path.basename(r["path"]) if r["path"] else "torch (reference)"
+            size = f"{r['size_mb']:7.1f}" if r["size_mb"] is not None else f"{'-':>7}"
+            print(f"{name:<22} {r['min_cosine']:9.5f} {r['mean_cosine']:9.5f} {r['query_ms']:9.2f} {size}")
+        print(f"{len(texts)} texts; parity {'OK' if not failed else 'FAILED'} (min cosine >= {args.min_cosine})")
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,5 @@
 from faker import Faker
-import random, json, uuid, os
+import argparse, random, json, uuid, os
 
 fake = Faker()
 
@@ -29,10 +29,9 @@ def rand_projects():
     choices = random.sample(PROJECT_TEMPLATES, n)
     return [c[0] for c in choices]
 
-def generate(n=20):
-    employees = []
+def iter_generate(n=20):
     for _ in range(n):
-        emp = {
+        yield {
             "id": str(uuid.uuid4()),
             "name": fake.name(),
             "skills": rand_skills(),
@@ -40,12 +39,22 @@ def generate(n=20):
             "projects": rand_projects(),
             "availability": random.choice(["available","not available"])
         }
-        employees.append(emp)
-    return {"employees": employees}
+
+def generate(n=20):
+    return {"employees": list(iter_generate(n))}
 
 if __name__ == "__main__":
-    os.makedirs("./data", exist_ok=True)
-    data = generate(20)
-    with open("./data/employee_data.json","w",encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    print("Generated ./data/employee_data.json")
+    parser = argparse.ArgumentParser(description="Generate a synthetic employee roster")
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--out", default="./data/employee_data.json", help="*.jsonl writes one employee per line")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out,"w",encoding="utf-8") as f:
+        if args.out.endswith(".jsonl"):
+            # streamed, so large rosters never sit in memory
+            for emp in iter_generate(args.n):
+                f.write(json.dumps(emp) + "\n")
+        else:
+            json.dump(generate(args.n), f, indent=2)
+    print(f"Generated {args.out}")
@@ -0,0 +1,32 @@
+import pytest
+from rag.attr_index import AttributeIndex
+from rag.columns import ColumnsBuilder, build_corpus_row
+
+SKILLS = [["PostgreSQL"], ["SQL"], ["Go"], ["MongoDB"], ["Golang", "Python"]]
+
+@pytest.fixture(scope="module")
+def attrs():
+    builder = ColumnsBuilder()
+    for i, skills in enumerate(SKILLS):
+        e = {"id": f"e{i}", "name": f"Person {i}", "skills": skills, "experience_years": i,
+             "projects": [], "availability": "available"}
+        builder.add(i, e, build_corpus_row(e))
+    return AttributeIndex(builder.build())
+
+@pytest.mark.parametrize("skill, rows", [
+    ("postgres", [0]),
+    ("sql", [0, 1]),
+    ("SQL", [0, 1]),
+    ("go", [2, 3, 4]),
+    ("python", [4]),
+])
+def test_search_keeps_substring_skill_match(attrs, skill, rows):
+    # /employees/search semantics: any skill containing the term
+    assert attrs.query(skill=skill).tolist() == rows
+
+@pytest.mark.parametrize("skill, rows", [
+    ("sql", [1]),
+    ("go", [2, 4]),
+])
+def test_hard_filter_matches_canonical_skills(attrs, skill, rows):
+    assert attrs.constraint_bitmap(skills=[skill]).nonzero()[0].tolist() == rows
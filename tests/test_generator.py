@@ -0,0 +1,51 @@
+import time
+import pytest
+from rag import generator
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class Model:
+    def __init__(self, delays):
+        self.delays = delays
+
+    def generate_content(self, prompt, stream=False):
+        for i, delay in enumerate(self.delays):
+            time.sleep(delay)
+            yield Chunk(f"c{i} ")
+
+@pytest.fixture
+def gemini(monkeypatch):
+    monkeypatch.setattr(generator, "use_gemini", lambda: True)
+    monkeypatch.setattr(generator, "LLM_TIMEOUT", 0.2)
+    monkeypatch.setattr(generator, "LLM_STREAM_TIMEOUT", 1.0)
+    return lambda delays: monkeypatch.setattr(generator, "get_gemini", lambda: Model(delays))
+
+def test_sync_stream_passes_chunks_through(gemini):
+    gemini([0, 0.01, 0])
+    assert "".join(generator.stream_answer("q", [])) == "c0 c1 c2 "
+
+def test_sync_stream_times_out_on_a_stalled_chunk(gemini):
+    gemini([0, 5])
+    stream = generator.stream_answer("q", [])
+    assert next(stream) == "c0 "
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        next(stream)
+    assert time.monotonic() - t0 < 1.0
+
+def test_sync_stream_caps_the_whole_answer(gemini):
+    # every chunk is within LLM_TIMEOUT, but together they run past LLM_STREAM_TIMEOUT
+    gemini([0.15] * 20)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        list(generator.stream_answer("q", []))
+    assert time.monotonic() - t0 < 1.5
+
+def test_sync_stream_raises_the_stream_error(gemini, monkeypatch):
+    def broken():
+        raise RuntimeError("quota")
+    monkeypatch.setattr(generator, "get_gemini", broken)
+    with pytest.raises(RuntimeError, match="quota"):
+        list(generator.stream_answer("q", []))
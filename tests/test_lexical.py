@@ -0,0 +1,33 @@
+import pytest
+from rag.columns import ColumnsBuilder, build_corpus_row
+from rag.lexical import BM25Index
+
+EMPLOYEES = [
+    {"id": "e0", "name": "Ada Lovelace", "skills": ["Python", "Scala"], "experience_years": 7,
+     "projects": ["Fraud Detection Service"], "availability": "available"},
+    {"id": "e1", "name": "Alan Turing", "skills": ["Go"], "experience_years": 3,
+     "projects": ["Gaming Leaderboard"], "availability": "not available"},
+]
+
+@pytest.fixture(scope="module")
+def bm25():
+    builder = ColumnsBuilder()
+    for i, e in enumerate(EMPLOYEES):
+        builder.add(i, e, build_corpus_row(e))
+    return BM25Index(builder.build())
+
+@pytest.mark.parametrize("word", ["skills", "exp", "years", "projects", "availability"])
+def test_corpus_labels_match_no_rows(bm25, word):
+    # every corpus row carries these labels; indexed, they would make every row a lexical hit
+    _, rows = bm25.search(word, 10)
+    assert rows.tolist() == []
+
+@pytest.mark.parametrize("query, rows", [
+    ("lovelace", [0]),
+    ("scala engineers", [0]),
+    ("fraud detection", [0]),
+    ("leaderboard", [1]),
+])
+def test_name_skill_and_project_words_match(bm25, query, rows):
+    _, got = bm25.search(query, 10)
+    assert got.tolist() == rows
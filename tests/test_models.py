@@ -0,0 +1,16 @@
+import pytest
+from pydantic import ValidationError
+from rag.config import MAX_TOP_K
+from rag.models import BatchChatQuery, ChatQuery
+
+@pytest.mark.parametrize("top_k", [0, -1, MAX_TOP_K + 1])
+def test_top_k_out_of_range_is_rejected(top_k):
+    with pytest.raises(ValidationError):
+        ChatQuery(message="python devs", top_k=top_k)
+    with pytest.raises(ValidationError):
+        BatchChatQuery(messages=["python devs"], top_k=top_k)
+
+@pytest.mark.parametrize("top_k", [1, 5, MAX_TOP_K])
+def test_top_k_in_range_is_accepted(top_k):
+    assert ChatQuery(message="python devs", top_k=top_k).top_k == top_k
+    assert BatchChatQuery(messages=["python devs"], top_k=top_k).top_k == top_k
@@ -0,0 +1,75 @@
+import os
+import numpy as np
+import pytest
+from rag.columns import ColumnsBuilder, build_corpus_row
+from rag.ingest import iter_employees
+from rag.retriever import (AVAILABILITY_BOOST, DOMAIN_BOOST, SKILL_BOOST, YEARS_BOOST, _taxonomy,
+                           parse_query, rerank)
+from rag.store import VectorStore
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data", "employee_data.json")
+
+QUERIES = [
+    "python developers with 3+ years",
+    "available react engineers",
+    "who has aws and docker experience in healthcare",
+    "5 years java fintech projects",
+    "golang backend 8+ yrs",
+    "ml engineer with pytorch, available now",
+    "need someone for an e-commerce project",
+    "scala spark pandas sql 2 years education",
+    "frontend people",
+]
+
+@pytest.fixture(scope="module")
+def store():
+    builder = ColumnsBuilder()
+    for i, e in enumerate(iter_employees(DATA)):
+        builder.add(i, e, build_corpus_row(e))
+    s = VectorStore()
+    s.columns = builder.build()
+    return s
+
+def scalar_rerank(parsed, dists, idxs, store, top_k):
+    # reference: the per-candidate loop rerank replaced, with the current matching rules
+    candidates = []
+    for dist, idx in zip(dists, idxs):
+        if idx == -1:
+            continue
+        emp = store.get_employee(int(idx))
+        score, reasons = float(dist), []
+        for s in parsed["skills"] or []:
+            matches = _taxonomy.skill_matcher(s)
+            if any(matches(k) for k in emp.skills):
+                score += SKILL_BOOST
+                reasons.append(f"skill:{s}")
+        if parsed["availability"] == "available" and emp.availability.lower() == "available":
+            score += AVAILABILITY_BOOST
+            reasons.append("availability:available")
+        if parsed["years"] is not None and emp.experience_years >= parsed["years"]:
+            score += YEARS_BOOST
+            reasons.append(f"years>={parsed['years']}")
+        if parsed["domain"] and any(_taxonomy.project_matcher(parsed["domain"])(p) for p in emp.projects):
+            score += DOMAIN_BOOST
+            reasons.append(f"domain:{parsed['domain']}")
+        candidates.append((score, emp, reasons))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return [(e.id, round(s, 4), r) for s, e, r in candidates[:top_k]]
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_vectorized_rerank_matches_scalar_loop(store, query):
+    rng = np.random.default_rng(len(query))
+    n = len(store.columns)
+    parsed = parse_query(query)
+    for trial in range(20):
+        m = int(rng.integers(1, n + 1))
+        idxs = rng.permutation(n)[:m].astype(np.int64)
+        idxs[rng.random(m) < 0.1] = -1  # empty FAISS slots
+        dists = np.sort(rng.uniform(-0.2, 0.9, size=m).astype(np.float32))[::-1]
+        if trial % 4 == 0:
+            dists[:] = dists[0]  # ties: both sides must keep FAISS order
+        top_k = int(rng.integers(1, n + 1))
+
+        items, _ = rerank(query, dists, idxs, store, top_k, parsed)
+        got = [(it.employee.id, it.score, it.reasons) for it in items]
+        assert got == scalar_rerank(parsed, dists, idxs, store, top_k)
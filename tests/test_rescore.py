@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from rag.columns import ColumnsBuilder
+from rag.index_factory import build_index
+from rag.store import VectorStore, rescore
+
+def _store(kind, n=8, d=16, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, d)).astype("float32")
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    builder = ColumnsBuilder()
+    for i in range(n):
+        e = {"id": f"e{i}", "name": f"Person {i}", "skills": ["Python"], "experience_years": i,
+             "projects": [], "availability": "available"}
+        builder.add(i, e, f"row {i}", vector=X[i])
+    store = VectorStore()
+    store.index = build_index(X, np.arange(n, dtype="int64"), kind)
+    store.columns = builder.build()
+    return store, X
+
+def _exact(X, q, rows, k):
+    sims = X[rows] @ q
+    order = np.argsort(-sims, kind="stable")[:k]
+    return sims[order], rows[order]
+
+@pytest.mark.parametrize("kind", ["sq8", "pq"])
+def test_rescore_with_fewer_candidates_than_k(kind):
+    # RESCORE_FACTOR * k exceeds ntotal: the shortlist is -1 padded, and the answer is still exact
+    store, X = _store(kind)
+    assert store.rescoring
+    q = X[3]
+    k = 12
+    dists, rows = store.search(q[None, :], k)
+    want_d, want_rows = _exact(X, q, np.arange(len(X)), len(X))
+    assert rows.shape == (k,)
+    np.testing.assert_array_equal(rows[:len(X)], want_rows)
+    np.testing.assert_allclose(dists[:len(X)], want_d, rtol=1e-6)
+    assert (rows[len(X):] == -1).all()
+
+@pytest.mark.parametrize("kind", ["sq8", "pq"])
+def test_rescore_under_filter_with_fewer_allowed_rows_than_k(kind):
+    store, X = _store(kind)
+    allowed = np.zeros(len(X), dtype=bool)
+    allowed[[1, 4, 6]] = True
+    q = X[0]
+    dists, rows = store.search(q[None, :], 5, allowed=allowed)
+    want_d, want_rows = _exact(X, q, np.flatnonzero(allowed), 3)
+    np.testing.assert_array_equal(rows, np.concatenate([want_rows, [-1, -1]]))
+    np.testing.assert_allclose(dists[:3], want_d, rtol=1e-6)
+
+def test_rescore_never_gathers_padding():
+    # a -1 slot must not read vectors[-1], the last row
+    vectors = np.eye(3, dtype="float32")
+    q = np.array([[0.0, 0.0, 1.0]], dtype="float32")
+    dists, rows = rescore(q, np.array([[0, -1, 1]]), vectors, 3)
+    assert rows[0].tolist() == [0, 1, -1]
+    assert dists[0, 0] == 0.0 and dists[0, 2] < -1e30
@@ -0,0 +1,51 @@
+import faiss
+import numpy as np
+import pytest
+from rag.columns import ColumnsBuilder, build_corpus_row
+from rag.index_factory import build_index
+from rag.store import IndexMismatch, StoreManager, VectorStore, version_path
+
+def _write_build(tmp_path, version, n=4, d=8, publish=True):
+    # one build's outputs as build_index.py lays them out: column bundle, index and its version sidecar
+    rng = np.random.default_rng(n)
+    X = rng.normal(size=(n, d)).astype("float32")
+    builder = ColumnsBuilder()
+    for i in range(n):
+        e = {"id": f"{version}-{i}", "name": f"Person {i}", "skills": ["Python"], "experience_years": i,
+             "projects": [], "availability": "available"}
+        builder.add(i, e, build_corpus_row(e))
+    builder.build().save(str(tmp_path / "columns"), {"index_version": version}, publish=publish)
+    index_path = str(tmp_path / "index.faiss")
+    faiss.write_index(build_index(X, np.arange(n, dtype="int64"), "flat"), index_path)
+    with open(version_path(index_path), "w", encoding="utf-8") as f:
+        f.write(version)
+    return index_path
+
+def _store(tmp_path, index_path):
+    return VectorStore(index_path, str(tmp_path / "meta.json"), str(tmp_path / "columns"))
+
+def test_load_checks_the_index_version(tmp_path):
+    index_path = _write_build(tmp_path, "v1")
+    store = _store(tmp_path, index_path)
+    store.load()
+    assert store.version == "v1"
+
+def test_load_refuses_an_index_from_another_build(tmp_path):
+    _write_build(tmp_path, "v1")
+    # same row count, new index written, CURRENT not switched yet
+    index_path = _write_build(tmp_path, "v2", publish=False)
+    with pytest.raises(IndexMismatch):
+        _store(tmp_path, index_path).load()
+
+def test_index_without_sidecar_still_loads(tmp_path):
+    index_path = _write_build(tmp_path, "v1")
+    (tmp_path / "index.faiss.version").unlink()
+    _store(tmp_path, index_path).load()
+
+def test_reload_keeps_the_live_store_while_a_build_is_written(tmp_path):
+    index_path = _write_build(tmp_path, "v1")
+    manager = StoreManager(index_path, str(tmp_path / "meta.json"), str(tmp_path / "columns"), poll_interval=0)
+    manager.reload()
+    _write_build(tmp_path, "v2", publish=False)
+    assert manager.reload() is False
+    assert manager.status()["index_version"] == "v1"
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from rag.attr_index import AttributeIndex
+from rag.columns import ColumnsBuilder, build_corpus_row
+from rag.retriever import constraint_mask, parse_query, rerank
+from rag.store import VectorStore
+
+PROJECTS = [
+    ["Medical Diagnosis Platform"],
+    ["Healthcare Dashboard"],
+    ["Ecommerce Storefront"],
+    ["E-commerce Platform"],
+    ["Fraud Detection Service"],
+    ["Gaming Leaderboard"],
+]
+
+@pytest.fixture(scope="module")
+def store():
+    builder = ColumnsBuilder()
+    for i, projects in enumerate(PROJECTS):
+        e = {"id": f"e{i}", "name": f"Person {i}", "skills": ["React Native"], "experience_years": 5,
+             "projects": projects, "availability": "available"}
+        builder.add(i, e, build_corpus_row(e))
+    s = VectorStore()
+    s.columns = builder.build()
+    s.attrs = AttributeIndex(s.columns)
+    return s
+
+@pytest.mark.parametrize("query, domain, rows", [
+    # synonym in the project name only
+    ("healthcare engineers", "healthcare", [0, 1]),
+    # synonym in the query and in the project name
+    ("medical app developers", "healthcare", [0, 1]),
+    ("ecommerce developers", "e-commerce", [2, 3]),
+    ("e-commerce developers", "e-commerce", [2, 3]),
+    ("react native fintech", "fintech", [4]),
+])
+def test_domain_synonyms_on_query_and_project_side(store, query, domain, rows):
+    parsed = parse_query(query)
+    assert parsed["domain"] == domain
+    assert np.flatnonzero(constraint_mask(parsed, store)).tolist() == rows
+
+    n = len(store.columns)
+    items, _ = rerank(query, np.zeros(n, dtype=np.float32), np.arange(n), store, n, parsed)
+    boosted = sorted(int(it.employee.id[1:]) for it in items if f"domain:{domain}" in it.reasons)
+    assert boosted == rows